@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+
+def save_recipe(
+    db: Session,
+    recipe_data: Dict,
+    video_url: str,
+    platform: str,
+    canonical_id: Optional[str] = None,
+    video_path: Optional[str] = None,
+    thumbnail_path: Optional[str] = None,
+    thumbnails: Optional[Dict] = None
+) -> schemas.Recipe:
+    """
+    Write a parsed recipe (recipe row, ingredients, steps, nutrition) with one
+    multi-row INSERT per table, inside the caller's transaction (caller commits).
+    The response model is built from the in-memory data, so nothing is re-queried.
+    Ingredients may carry precomputed 'store_links'.
+    """
+    recipe_row = {
+        "title": recipe_data.get('title'),
+        "video_url": video_url,
+        "platform": platform,
+        "canonical_id": canonical_id,
+        "thumbnail_path": thumbnail_path,
+        "thumbnails": thumbnails,
+        "video_path": video_path,
+        "description": recipe_data.get('description'),
+        "created_at": datetime.utcnow(),
+    }
+    recipe_id = db.execute(insert(models.Recipe).values(**recipe_row)).inserted_primary_key[0]
+
+    ingredient_rows = [
+        {
+            "recipe_id": recipe_id,
+            "name": ing_data['name'],
+            "quantity": ing_data.get('quantity'),
+            "unit": ing_data.get('unit'),
+            "store_links": ing_data.get('store_links'),
+        }
+        for ing_data in recipe_data.get('ingredients') or []
+    ]
+    step_rows = [
+        {
+            "recipe_id": recipe_id,
+            "step_number": step_data.get('step_number', index + 1),
+            "instruction": step_data['instruction'],
+            "duration": step_data.get('duration'),
+        }
+        for index, step_data in enumerate(recipe_data.get('steps') or [])
+    ]
+
+    _insert_many(db, models.Ingredient, ingredient_rows)
+    _insert_many(db, models.CookingStep, step_rows)
+
+    nutrition = None
+    nutrition_data = recipe_data.get('nutrition') or {}
+    if any(nutrition_data.values()):
+        nutrition_row = {
+            "recipe_id": recipe_id,
+            "calories": nutrition_data.get('calories'),
+            "protein": nutrition_data.get('protein'),
+            "carbs": nutrition_data.get('carbs'),
+            "fats": nutrition_data.get('fats'),
+            "fiber": nutrition_data.get('fiber'),
+            "servings": nutrition_data.get('servings'),
+        }
+        nutrition_row["id"] = db.execute(
+            insert(models.NutritionInfo).values(**nutrition_row)
+        ).inserted_primary_key[0]
+        nutrition = schemas.NutritionInfo(**nutrition_row)
+
+    return schemas.Recipe(
+        id=recipe_id,
+        **recipe_row,
+        ingredients=[schemas.Ingredient(**row) for row in ingredient_rows],
+        steps=[schemas.CookingStep(**row) for row in sorted(step_rows, key=lambda row: row["step_number"])],
+        nutrition=nutrition,
+    )
+
+
+def _insert_many(db: Session, model, rows: list):
+    """Batched multi-row INSERT ... RETURNING id that fills the generated ids back into rows"""
+    if not rows:
+        return
+    # Core insert keeps every row in one batch (the ORM path splits rows by which values are None)
+    table = model.__table__
+    if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        # sort_by_parameter_order makes RETURNING yield ids in the order of `rows`
+        ids = db.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+    else:
+        # No ordered RETURNING for executemany (e.g. MySQL): one INSERT per row
+        ids = [db.execute(insert(table).values(**row)).inserted_primary_key[0] for row in rows]
+    for row, row_id in zip(rows, ids):
+        row["id"] = row_id
@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from .models import Base
+from .migrations import run_migrations
 import os
 from dotenv import load_dotenv
 
@@ -8,17 +9,65 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./recipes.db")
 
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _sqlite_engine_options() -> dict:
+    # SQLite's own timeout (seconds) backs up busy_timeout for the initial connect
+    busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    return {
+        "connect_args": {"check_same_thread": False, "timeout": busy_timeout_ms / 1000},
+    }
+
+
+def _server_engine_options() -> dict:
+    """Pool settings for Postgres/MySQL; size them to (workers x threads) per process"""
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", "true"),
+    }
+
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    **(_sqlite_engine_options() if IS_SQLITE else _server_engine_options())
 )
 
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Per-connection SQLite tuning: WAL lets readers run alongside the single writer,
+        busy_timeout waits for locks instead of failing with 'database is locked'.
+        """
+        pragmas = {
+            "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+            "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+            "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+            "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+            "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # negative = KiB (64 MiB)
+            "temp_store": "MEMORY",
+        }
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 def init_db():
-    """Initialize the database by creating all tables"""
+    """Initialize the database by creating all tables and applying pending migrations"""
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
 
 def get_db():
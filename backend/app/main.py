@@ -1,18 +1,22 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List
-import os
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session, load_only, selectinload
+from typing import Optional
+import asyncio
+import json
 from pathlib import Path
 
-from .database import get_db, init_db
+from .database import SessionLocal, get_db, init_db
 from . import models, schemas
+from .pagination import paginate_recipes
 from .services.video_downloader import VideoDownloader
-from .services.gemini_service import GeminiService
 from .services.store_scraper import StoreScraper
 from .services.export_service import ExportService
+from .services.job_queue import JobQueue, ExtractionJob
+from .services.metrics import file_processing_metrics
+from .services.extraction_pipeline import ExtractionPipeline, find_existing_recipe_id, find_existing_recipe_ids
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -45,16 +49,27 @@ app.mount("/images", StaticFiles(directory=str(IMAGES_DIR)), name="images")
 app.mount("/exports", StaticFiles(directory=str(EXPORTS_DIR)), name="exports")
 app.mount("/videos", StaticFiles(directory=str(VIDEOS_DIR)), name="videos")
 
-# Initialize services (GeminiService will be created per request with selected model)
+# Initialize services (GeminiService is created per job with the selected model)
 video_downloader = VideoDownloader()
 store_scraper = StoreScraper()
 export_service = ExportService()
 
+# Extraction jobs run on a pool of background workers (size: EXTRACTION_WORKERS)
+extraction_pipeline = ExtractionPipeline(video_downloader, store_scraper)
+job_queue = JobQueue(extraction_pipeline.run)
+
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize database and start extraction workers on startup"""
     init_db()
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop extraction workers"""
+    await job_queue.stop()
 
 
 @app.get("/")
@@ -67,132 +82,218 @@ async def root():
     }
 
 
-@app.post("/api/recipes/extract", response_model=schemas.RecipeResponse)
+@app.post("/api/recipes/extract", response_model=schemas.ExtractionJob, status_code=202)
 async def extract_recipe(
     recipe_input: schemas.RecipeCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
-    Extract recipe from TikTok or Instagram video URL
+    Queue recipe extraction from a TikTok or Instagram video URL.
+    Returns a job immediately; poll /api/jobs/{job_id} for progress and the result.
     """
-    try:
-        video_url = recipe_input.video_url
-        selected_model = recipe_input.model or "gemini-3-flash-preview"
+    job = await _submit_extraction(recipe_input, db)
+    return _job_response(job, db)
+
+
+@app.post("/api/recipes/extract/stream")
+async def extract_recipe_stream(
+    recipe_input: schemas.RecipeCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Queue recipe extraction and stream its progress as NDJSON: the job, then
+    'stage' events, 'partial' recipe fields as Gemini writes them ('partial_reset'
+    when an attempt is retried), and finally 'completed' with the saved recipe or 'failed'.
+    """
+    job = await _submit_extraction(recipe_input, db, stream_partials=True)
+
+    async def stream():
+        yield _ndjson({"type": "job", **job.to_dict()}, default=str)
+        async for event in job.stream_events():
+            if event["type"] == "completed":
+                if job.recipe is not None:
+                    recipe = job.recipe.model_dump(mode="json")
+                else:
+                    recipe = await asyncio.to_thread(_load_recipe_json, event["recipe_id"])
+                event = {**event, "recipe": recipe}
+            yield _ndjson(event)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-        # Check if recipe already exists
-        existing_recipe = db.query(models.Recipe).filter(
-            models.Recipe.video_url == video_url
-        ).first()
 
-        if existing_recipe:
-            return schemas.RecipeResponse(
-                success=True,
-                message="Recipe already exists in database",
-                recipe=existing_recipe
-            )
-
-        # Download video
-        platform, video_path, thumbnail_path = video_downloader.download_video(video_url)
-
-        # Resolve absolute video path for Gemini upload
-        video_abs_path = video_downloader.get_absolute_video_path(video_path)
-        if not video_abs_path or not Path(video_abs_path).exists():
-            raise Exception(f"Downloaded video not found at: {video_abs_path}")
-
-        # Create GeminiService with selected model
-        gemini_service = GeminiService(model_name=selected_model)
-
-        # Analyze video with Gemini
-        recipe_data = gemini_service.analyze_video(video_abs_path)
-
-        # Create recipe in database
-        db_recipe = models.Recipe(
-            title=recipe_data.get('title'),
-            video_url=video_url,
-            platform=platform,
-            thumbnail_path=thumbnail_path,
-            video_path=video_path,
-            description=recipe_data.get('description')
+async def _submit_extraction(
+    recipe_input: schemas.RecipeCreate,
+    db: Session,
+    stream_partials: bool = False
+) -> ExtractionJob:
+    video_url = recipe_input.video_url
+    selected_model = recipe_input.model or "gemini-3-flash-preview"
+
+    try:
+        # Resolve the video identity (may follow short-link redirects) off the event loop
+        platform, native_id = await asyncio.to_thread(video_downloader.canonicalize_url, video_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    canonical_id = video_downloader.canonical_key(platform, native_id)
+
+    # Check if recipe already exists
+    existing_id = find_existing_recipe_id(db, video_url, canonical_id)
+    if existing_id is not None:
+        job = ExtractionJob(
+            video_url, selected_model, canonical_id=canonical_id, mode=recipe_input.mode, tier=recipe_input.tier
         )
-        db.add(db_recipe)
-        db.flush()
-
-        # Add ingredients
-        for ing_data in recipe_data.get('ingredients', []):
-            # Get store links for each ingredient
-            store_links = store_scraper.find_ingredient_stores(ing_data['name'])
-
-            ingredient = models.Ingredient(
-                recipe_id=db_recipe.id,
-                name=ing_data['name'],
-                quantity=ing_data.get('quantity'),
-                unit=ing_data.get('unit'),
-                store_links=store_links
-            )
-            db.add(ingredient)
-
-        # Add cooking steps
-        for step_data in recipe_data.get('steps', []):
-            step = models.CookingStep(
-                recipe_id=db_recipe.id,
-                step_number=step_data['step_number'],
-                instruction=step_data['instruction'],
-                duration=step_data.get('duration')
-            )
-            db.add(step)
-
-        # Add nutrition info
-        nutrition_data = recipe_data.get('nutrition', {})
-        if nutrition_data and any(nutrition_data.values()):
-            nutrition = models.NutritionInfo(
-                recipe_id=db_recipe.id,
-                calories=nutrition_data.get('calories'),
-                protein=nutrition_data.get('protein'),
-                carbs=nutrition_data.get('carbs'),
-                fats=nutrition_data.get('fats'),
-                fiber=nutrition_data.get('fiber'),
-                servings=nutrition_data.get('servings')
-            )
-            db.add(nutrition)
-
-        db.commit()
-        db.refresh(db_recipe)
-
-        # Clean up video file after successful extraction (keep only thumbnail)
-        # This saves storage space - we only need the thumbnail and recipe data
-        try:
-            video_downloader.cleanup_video(video_path)
-        except Exception as cleanup_error:
-            # Don't fail the request if cleanup fails
-            print(f"Warning: Failed to cleanup video: {cleanup_error}")
-
-        return schemas.RecipeResponse(
-            success=True,
-            message="Recipe extracted successfully",
-            recipe=db_recipe
+        job.complete(existing_id, "Recipe already exists in database")
+        job_queue.register(job)
+    else:
+        job = job_queue.submit(
+            video_url, selected_model, canonical_id=canonical_id, mode=recipe_input.mode, tier=recipe_input.tier,
+            stream_partials=stream_partials
         )
+    return job
 
-    except Exception as e:
-        db.rollback()
-        # Try to cleanup video on failure too
-        try:
-            if 'video_path' in locals():
-                video_downloader.cleanup_video(video_path)
-        except:
-            pass
-        raise HTTPException(status_code=500, detail=str(e))
 
+def _load_recipe_json(recipe_id: int) -> Optional[dict]:
+    # Own session: the request's session may already be closed while the response streams
+    db = SessionLocal()
+    try:
+        recipe = db.query(models.Recipe).filter(models.Recipe.id == recipe_id).first()
+        return schemas.Recipe.model_validate(recipe).model_dump(mode="json") if recipe else None
+    finally:
+        db.close()
 
-@app.get("/api/recipes", response_model=List[schemas.Recipe])
+
+@app.post("/api/recipes/extract/batch")
+async def extract_recipes_batch(
+    batch_input: schemas.BatchExtractRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Queue extraction for many video URLs at once.
+    Streams one NDJSON line per URL as soon as its outcome is known: 'invalid',
+    'existing' (already in the database), then 'completed' or 'failed' as jobs finish.
+    """
+    selected_model = batch_input.model or "gemini-3-flash-preview"
+    video_urls = list(dict.fromkeys(batch_input.video_urls))  # drop exact repeats, keep order
+
+    # Resolve video identities concurrently (short links need a redirect lookup)
+    resolve_slots = asyncio.Semaphore(16)
+
+    async def resolve(video_url: str):
+        async with resolve_slots:
+            try:
+                platform, native_id = await asyncio.to_thread(video_downloader.canonicalize_url, video_url)
+                return video_url, video_downloader.canonical_key(platform, native_id), None
+            except ValueError as e:
+                return video_url, None, str(e)
+
+    resolved = await asyncio.gather(*(resolve(video_url) for video_url in video_urls))
+    valid = [(video_url, canonical_id) for video_url, canonical_id, error in resolved if not error]
+
+    # One query for everything that is already stored
+    existing = find_existing_recipe_ids(db, valid)
+
+    async def stream():
+        for video_url, _, error in resolved:
+            if error:
+                yield _ndjson({"video_url": video_url, "status": "invalid", "error": error})
+
+        jobs = {}
+        urls_by_key = {}
+        for video_url, canonical_id in valid:
+            key = canonical_id or video_url
+            if key in existing:
+                yield _ndjson({"video_url": video_url, "status": "existing", "recipe_id": existing[key]})
+                continue
+            if key not in jobs:
+                jobs[key] = job_queue.submit(
+                    video_url, selected_model, canonical_id=canonical_id,
+                    mode=batch_input.mode, tier=batch_input.tier
+                )
+            # Variants of one video in the same batch share a job
+            urls_by_key.setdefault(key, []).append(video_url)
+
+        for finished in asyncio.as_completed([job.wait() for job in jobs.values()]):
+            job = await finished
+            for video_url in urls_by_key[job.key]:
+                yield _ndjson({
+                    "video_url": video_url,
+                    "status": job.status,
+                    "job_id": job.id,
+                    "recipe_id": job.recipe_id,
+                    "error": job.error,
+                })
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def _ndjson(payload: dict, default=None) -> str:
+    return json.dumps(payload, default=default) + "\n"
+
+
+@app.get("/api/jobs/{job_id}", response_model=schemas.ExtractionJob)
+async def get_job(job_id: str, db: Session = Depends(get_db)):
+    """Get the stage and result of an extraction job"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job, db)
+
+
+def _job_response(job: ExtractionJob, db: Session) -> dict:
+    response = job.to_dict()
+    if job.recipe is not None:
+        # Built from the saved data when the job finished; no re-query needed
+        response["recipe"] = job.recipe
+    elif job.recipe_id is not None:
+        response["recipe"] = db.query(models.Recipe).filter(
+            models.Recipe.id == job.recipe_id
+        ).first()
+    return response
+
+
+@app.get("/api/recipes", response_model=schemas.RecipePage)
 async def get_recipes(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db)
 ):
-    """Get all recipes"""
-    recipes = db.query(models.Recipe).offset(skip).limit(limit).all()
-    return recipes
+    """Get recipes, newest first. Pass next_cursor back as cursor for the next page."""
+    # Load children for the whole page in one batched query per relationship (no N+1)
+    query = db.query(models.Recipe).options(
+        selectinload(models.Recipe.ingredients),
+        selectinload(models.Recipe.steps),
+        selectinload(models.Recipe.nutrition)
+    )
+    try:
+        recipes, next_cursor = paginate_recipes(query, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": recipes, "next_cursor": next_cursor}
+
+
+@app.get("/api/recipes/summary", response_model=schemas.RecipeSummaryPage)
+async def get_recipe_summaries(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Get recipe cards for the gallery (title, thumbnail, platform) without child rows"""
+    query = db.query(models.Recipe).options(
+        load_only(
+            models.Recipe.id,
+            models.Recipe.title,
+            models.Recipe.video_url,
+            models.Recipe.platform,
+            models.Recipe.thumbnail_path,
+            models.Recipe.thumbnails,
+            models.Recipe.created_at
+        )
+    )
+    try:
+        recipes, next_cursor = paginate_recipes(query, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": recipes, "next_cursor": next_cursor}
 
 
 @app.get("/api/recipes/{recipe_id}", response_model=schemas.Recipe)
@@ -216,7 +317,8 @@ async def delete_recipe(recipe_id: int, db: Session = Depends(get_db)):
     try:
         cleanup_result = video_downloader.cleanup_recipe_files(
             recipe.video_path,
-            recipe.thumbnail_path
+            recipe.thumbnail_path,
+            recipe.thumbnails
         )
     except Exception as cleanup_error:
         print(f"Warning: Failed to cleanup files: {cleanup_error}")
@@ -270,6 +372,7 @@ async def export_recipe_json(recipe_id: int, db: Session = Depends(get_db)):
         "video_url": recipe.video_url,
         "platform": recipe.platform,
         "thumbnail_path": recipe.thumbnail_path,
+        "thumbnails": recipe.thumbnails,
         "ingredients": [
             {
                 "name": ing.name,
@@ -344,6 +447,12 @@ async def export_recipe_pdf(recipe_id: int, db: Session = Depends(get_db)):
     return FileResponse(filepath, media_type="application/pdf", filename=f"recipe_{recipe_id}.pdf")
 
 
+@app.get("/api/metrics/gemini-files")
+async def gemini_file_metrics():
+    """Upload and ACTIVE-processing time distribution for recent Gemini file uploads"""
+    return file_processing_metrics.summary()
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
@@ -0,0 +1,101 @@
+"""
+Ordered schema migrations for databases created by an older version of the app.
+create_all() only creates missing tables, so columns and indexes added to existing
+tables are applied here. Each migration runs once and is recorded in schema_migrations;
+steps are idempotent so they are also safe on a freshly created database.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import models
+
+_migrations_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _migrations_metadata,
+    Column("name", String(200), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _add_column(conn: Connection, table_name: str, column):
+    """Add a (nullable) model column to an existing table if it is missing"""
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if column.name in existing:
+        return
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}"))
+
+
+def _create_indexes(conn: Connection, table, *names: str):
+    """Create the named model indexes if they don't exist yet"""
+    for index in table.indexes:
+        if index.name in names:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _recipe_canonical_id(conn: Connection):
+    recipes = models.Recipe.__table__
+    _add_column(conn, "recipes", recipes.c.canonical_id)
+    _create_indexes(conn, recipes, "ix_recipes_canonical_id")
+
+
+def _backfill_canonical_ids(conn: Connection):
+    """Derive canonical ids for rows stored before they existed (no network lookups)"""
+    from .services.video_downloader import VideoDownloader
+
+    downloader = VideoDownloader()
+    recipes = models.Recipe.__table__
+    rows = conn.execute(
+        select(recipes.c.id, recipes.c.video_url).where(recipes.c.canonical_id.is_(None))
+    ).all()
+    for recipe_id, video_url in rows:
+        try:
+            platform, native_id = downloader.canonicalize_url(video_url, resolve=False)
+        except ValueError:
+            continue
+        canonical_id = downloader.canonical_key(platform, native_id)
+        if canonical_id:
+            conn.execute(
+                recipes.update().where(recipes.c.id == recipe_id).values(canonical_id=canonical_id)
+            )
+
+
+def _recipe_listing_index(conn: Connection):
+    _create_indexes(conn, models.Recipe.__table__, "ix_recipes_created_at_id")
+
+
+def _child_foreign_key_indexes(conn: Connection):
+    _create_indexes(conn, models.Ingredient.__table__, "ix_ingredients_recipe_id")
+    _create_indexes(conn, models.CookingStep.__table__, "ix_cooking_steps_recipe_id_step_number")
+
+
+def _recipe_thumbnails(conn: Connection):
+    _add_column(conn, "recipes", models.Recipe.__table__.c.thumbnails)
+
+
+MIGRATIONS = [
+    ("0001_recipe_canonical_id", _recipe_canonical_id),
+    ("0002_backfill_canonical_ids", _backfill_canonical_ids),
+    ("0003_recipe_listing_index", _recipe_listing_index),
+    ("0004_child_foreign_key_indexes", _child_foreign_key_indexes),
+    ("0005_recipe_thumbnails", _recipe_thumbnails),
+]
+
+
+def run_migrations(engine: Engine):
+    """Apply every migration not yet recorded in schema_migrations, in order"""
+    _migrations_metadata.create_all(bind=engine)
+
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.name)).scalars())
+
+    for name, migration in MIGRATIONS:
+        if name in applied:
+            continue
+        with engine.begin() as conn:
+            migration(conn)
+            conn.execute(schema_migrations.insert().values(name=name, applied_at=datetime.utcnow()))
+        print(f"Applied migration {name}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -13,22 +13,30 @@ class Recipe(Base):
     title = Column(String(500), nullable=True)
     video_url = Column(String(1000), nullable=False, unique=True)
     platform = Column(String(50), nullable=False)  # 'instagram' or 'tiktok'
+    canonical_id = Column(String(200), nullable=True, index=True)  # e.g. 'tiktok:<video id>', 'instagram:<shortcode>'
     thumbnail_path = Column(String(500), nullable=True)
+    thumbnails = Column(JSON, nullable=True)  # {"160"|"480"|"full": {"webp": path, "jpg": path}}
     video_path = Column(String(500), nullable=True)
     description = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     ingredients = relationship("Ingredient", back_populates="recipe", cascade="all, delete-orphan")
-    steps = relationship("CookingStep", back_populates="recipe", cascade="all, delete-orphan")
+    steps = relationship("CookingStep", back_populates="recipe", cascade="all, delete-orphan",
+                         order_by="CookingStep.step_number")
     nutrition = relationship("NutritionInfo", back_populates="recipe", uselist=False, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination order for listings (see pagination.py)
+        Index("ix_recipes_created_at_id", "created_at", "id"),
+    )
+
 
 class Ingredient(Base):
     __tablename__ = "ingredients"
 
     id = Column(Integer, primary_key=True, index=True)
-    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
+    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False, index=True)
     name = Column(String(200), nullable=False)
     quantity = Column(String(100), nullable=True)
     unit = Column(String(50), nullable=True)
@@ -48,6 +56,11 @@ class CookingStep(Base):
 
     recipe = relationship("Recipe", back_populates="steps")
 
+    __table_args__ = (
+        # Covers lookups by recipe_id and returns steps already in order
+        Index("ix_cooking_steps_recipe_id_step_number", "recipe_id", "step_number"),
+    )
+
 
 class NutritionInfo(Base):
     __tablename__ = "nutrition_info"
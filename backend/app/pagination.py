@@ -0,0 +1,54 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+from . import models
+
+
+def encode_cursor(created_at: datetime, recipe_id: int) -> str:
+    """Opaque keyset cursor pointing just after the given recipe"""
+    raw = f"{created_at.isoformat()}|{recipe_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, recipe_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(recipe_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def paginate_recipes(query: Query, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Keyset pagination over (created_at, id), newest first.
+    Each page seeks directly via ix_recipes_created_at_id, so page N costs the
+    same as page 1 and concurrent inserts never shift later pages.
+    Returns (recipes, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor:
+        created_at, recipe_id = decode_cursor(cursor)
+        # Row-value comparison: the planner turns it into a range seek on the index,
+        # whereas the equivalent OR of two conditions becomes an index scan
+        query = query.filter(
+            tuple_(models.Recipe.created_at, models.Recipe.id) < (created_at, recipe_id)
+        )
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.order_by(
+        models.Recipe.created_at.desc(),
+        models.Recipe.id.desc()
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, HttpUrl
-from typing import List, Optional, Dict
+from pydantic import BaseModel, Field, HttpUrl
+from typing import List, Literal, Optional, Dict
 from datetime import datetime
 
 
@@ -61,6 +61,27 @@ class NutritionInfo(NutritionInfoBase):
         from_attributes = True
 
 
+# Response schemas for Gemini structured output (no ids or store links).
+# Fields are required but nullable so the model always emits every key.
+class ExtractedIngredient(BaseModel):
+    name: str
+    quantity: Optional[str]
+    unit: Optional[str]
+
+
+class RecipeExtraction(BaseModel):
+    title: Optional[str]
+    description: Optional[str]
+    ingredients: List[ExtractedIngredient]
+    steps: List[CookingStepBase]
+    nutrition: Optional[NutritionInfoBase]
+
+
+class ScoredRecipeExtraction(RecipeExtraction):
+    """Frames/transcript extraction: adds the model's 0-1 confidence in the result"""
+    confidence: float
+
+
 class RecipeBase(BaseModel):
     title: Optional[str] = None
     video_url: str
@@ -68,14 +89,35 @@ class RecipeBase(BaseModel):
     description: Optional[str] = None
 
 
+# 'video' uploads the whole file; 'frames' sends sampled keyframes inline;
+# 'transcript' sends caption/subtitle text (or narration audio) plus a few frames.
+# The reduced modes escalate to 'video' when their result looks incomplete.
+ExtractionMode = Literal["video", "frames", "transcript"]
+
+# Thinking level / output budget / media resolution for the Gemini calls (fast -> deep).
+# 'auto' starts at fast and reruns at the next tier only if the result fails validation.
+ExtractionTier = Literal["fast", "standard", "deep", "auto"]
+
+
 class RecipeCreate(BaseModel):
     video_url: str
     model: Optional[str] = "gemini-3-flash-preview"  # Default to free tier model
+    mode: ExtractionMode = "video"
+    tier: ExtractionTier = "auto"
+
+
+class BatchExtractRequest(BaseModel):
+    video_urls: List[str] = Field(..., min_length=1, max_length=500)
+    model: Optional[str] = "gemini-3-flash-preview"
+    mode: ExtractionMode = "video"
+    tier: ExtractionTier = "auto"
 
 
 class Recipe(RecipeBase):
     id: int
+    canonical_id: Optional[str] = None
     thumbnail_path: Optional[str] = None
+    thumbnails: Optional[Dict[str, Dict[str, str]]] = None  # size -> {"webp", "jpg"} paths
     video_path: Optional[str] = None
     created_at: datetime
     ingredients: List[Ingredient] = []
@@ -86,12 +128,52 @@ class Recipe(RecipeBase):
         from_attributes = True
 
 
+class RecipeSummary(BaseModel):
+    """Lightweight recipe listing for the gallery (no ingredients, steps or nutrition)"""
+    id: int
+    title: Optional[str] = None
+    video_url: str
+    platform: str
+    thumbnail_path: Optional[str] = None
+    thumbnails: Optional[Dict[str, Dict[str, str]]] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class RecipePage(BaseModel):
+    items: List[Recipe]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to fetch the next page
+
+
+class RecipeSummaryPage(BaseModel):
+    items: List[RecipeSummary]
+    next_cursor: Optional[str] = None
+
+
 class RecipeResponse(BaseModel):
     success: bool
     message: str
     recipe: Optional[Recipe] = None
 
 
+class ExtractionJob(BaseModel):
+    job_id: str
+    status: str  # 'queued', 'running', 'completed' or 'failed'
+    stage: str
+    video_url: str
+    model: str
+    mode: str = "video"
+    tier: str = "auto"
+    message: Optional[str] = None
+    error: Optional[str] = None
+    recipe_id: Optional[int] = None
+    recipe: Optional[Recipe] = None
+    created_at: datetime
+    updated_at: datetime
+
+
 class GroceryListItem(BaseModel):
     ingredient: str
     quantity: str
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class JsonFileCache:
+    """
+    Persistent JSON cache stored as one file per key under a directory.
+    Least-recently-used entries are evicted once the directory exceeds max_bytes;
+    entries older than ttl_seconds (if set) are treated as misses.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, ttl_seconds: Optional[int] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._total_bytes = sum(f.stat().st_size for f in self.directory.glob("*.json"))
+
+    def _path_for(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached value for key, or None on a miss"""
+        path = self._path_for(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if self.ttl_seconds is not None and time.time() - entry.get("stored_at", 0) > self.ttl_seconds:
+            self.delete(key)
+            return None
+
+        try:
+            # Mark as recently used for eviction ordering
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def set(self, key: str, value: Dict):
+        """Store value under key, evicting old entries if the cache is over budget"""
+        path = self._path_for(key)
+        data = json.dumps({"key": key, "stored_at": time.time(), "value": value}, ensure_ascii=False)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+
+        with self._lock:
+            previous_size = path.stat().st_size if path.exists() else 0
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._total_bytes += path.stat().st_size - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str):
+        path = self._path_for(key)
+        with self._lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        """Delete least-recently-used entries until under 90% of the budget (lock held)"""
+        entries = []
+        for f in self.directory.glob("*.json"):
+            try:
+                stat = f.stat()
+                entries.append((stat.st_mtime, stat.st_size, f))
+            except FileNotFoundError:
+                continue
+
+        self._total_bytes = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, f in sorted(entries, key=lambda entry: entry[0]):
+            if self._total_bytes <= target:
+                break
+            try:
+                f.unlink()
+                self._total_bytes -= size
+            except FileNotFoundError:
+                continue
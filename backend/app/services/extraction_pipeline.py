@@ -0,0 +1,327 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..crud import save_recipe
+from ..database import SessionLocal
+from .gemini_service import GeminiService, extraction_confidence
+from .job_queue import ExtractionJob
+from .store_scraper import StoreScraper
+from .throttle import Throttle
+from .video_downloader import VideoDownloader
+from .video_transcoder import video_transcoder
+
+# Frames mode: how many keyframes to send, and the confidence below which the
+# full video is analyzed instead
+FRAMES_MODE_COUNT = int(os.getenv("FRAMES_MODE_COUNT", "8"))
+FRAMES_MIN_CONFIDENCE = float(os.getenv("FRAMES_MIN_CONFIDENCE", "0.6"))
+
+# Transcript mode: a few small frames for what the narration doesn't say, and when
+# to send the narration audio ('fallback' = only without subtitles, 'always', 'never')
+TRANSCRIPT_FRAME_COUNT = int(os.getenv("TRANSCRIPT_FRAME_COUNT", "4"))
+TRANSCRIPT_FRAME_MAX_WIDTH = int(os.getenv("TRANSCRIPT_FRAME_MAX_WIDTH", "512"))
+TRANSCRIPT_AUDIO = os.getenv("TRANSCRIPT_AUDIO", "fallback").lower()
+TRANSCRIPT_MIN_CONFIDENCE = float(os.getenv("TRANSCRIPT_MIN_CONFIDENCE", "0.6"))
+
+
+class ExtractionPipeline:
+    """
+    Runs one extraction job: download -> upload -> analyze -> persist.
+    With STREAM_DOWNLOADS the video goes straight from the download into the
+    upload through a memory buffer instead of a file in data/videos.
+    Downloads and database writes run in worker threads; Gemini calls use the
+    SDK's async client, so the event loop is never held.
+    Downloads (per platform) and Gemini calls are separately throttled across all jobs
+    (TIKTOK_/INSTAGRAM_DOWNLOAD_CONCURRENCY, GEMINI_CONCURRENCY, GEMINI_REQUESTS_PER_MINUTE).
+    """
+
+    def __init__(self, video_downloader: VideoDownloader, store_scraper: StoreScraper, session_factory=SessionLocal):
+        self.video_downloader = video_downloader
+        self.store_scraper = store_scraper
+        self.session_factory = session_factory
+        # Per-platform download budgets: Instagram rate limits far sooner than TikTok
+        default_downloads = int(os.getenv("DOWNLOAD_CONCURRENCY", "4"))
+        self.download_throttles = {
+            "tiktok": Throttle(int(os.getenv("TIKTOK_DOWNLOAD_CONCURRENCY", default_downloads))),
+            "instagram": Throttle(
+                int(os.getenv("INSTAGRAM_DOWNLOAD_CONCURRENCY", "2")),
+                per_minute=float(os.getenv("INSTAGRAM_DOWNLOADS_PER_MINUTE", "0"))
+            ),
+        }
+        self.download_throttle = Throttle(default_downloads)
+        self.gemini_throttle = Throttle(
+            int(os.getenv("GEMINI_CONCURRENCY", "4")),
+            per_minute=float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "0"))
+        )
+
+    async def run(self, job: ExtractionJob):
+        """Job queue handler"""
+        existing_id = await asyncio.to_thread(self._find_existing, job.video_url, job.canonical_id)
+        if existing_id is not None:
+            job.complete(existing_id, "Recipe already exists in database")
+            return
+
+        # Frame sampling needs a file on disk, so the reduced-input modes always download one
+        if self.video_downloader.stream_downloads and job.mode == "video":
+            platform, video_path, thumbnail_path, recipe_data = await self._extract_streamed(job)
+        else:
+            platform, video_path, thumbnail_path, recipe_data = await self._extract_from_file(job)
+
+        # Create recipe in database
+        job.set_stage("saving")
+        recipe_id, recipe = await asyncio.to_thread(
+            self._save_recipe, job.video_url, job.canonical_id, platform, video_path, thumbnail_path, recipe_data
+        )
+
+        job.complete(recipe_id, recipe=recipe)
+
+    async def _extract_from_file(self, job: ExtractionJob) -> Tuple[str, str, Optional[str], Dict]:
+        """Download to data/videos, analyze from the file, then delete it"""
+        video_path = None
+        try:
+            # Download video
+            job.set_stage("downloading")
+            async with self._download_throttle(job.video_url):
+                platform, video_path, thumbnail_path = await asyncio.to_thread(
+                    self.video_downloader.download_video, job.video_url
+                )
+
+            # Resolve absolute video path for Gemini upload
+            video_abs_path = self.video_downloader.get_absolute_video_path(video_path)
+            if not video_abs_path or not Path(video_abs_path).exists():
+                raise Exception(f"Downloaded video not found at: {video_abs_path}")
+
+            gemini_service = GeminiService(
+                model_name=job.model_name, tier=job.tier, on_partial=self._partial_callback(job)
+            )
+            recipe_data = None
+            if job.mode == "frames":
+                recipe_data = await self._analyze_frames(job, gemini_service, video_abs_path)
+            elif job.mode == "transcript":
+                recipe_data = await self._analyze_transcript(job, gemini_service, video_abs_path)
+            if recipe_data is None:
+                recipe_data = await self._analyze_video(job, gemini_service, video_abs_path)
+            return platform, video_path, thumbnail_path, recipe_data
+        finally:
+            # Clean up video file (keep only thumbnail) whether or not extraction succeeded
+            if video_path:
+                try:
+                    await asyncio.to_thread(self.video_downloader.cleanup_video, video_path)
+                except Exception as cleanup_error:
+                    # Don't fail the job if cleanup fails
+                    print(f"Warning: Failed to cleanup video: {cleanup_error}")
+
+    async def _analyze_video(self, job: ExtractionJob, gemini_service: GeminiService, video_abs_path: str) -> Dict:
+        """Full-video analysis (reports transcoding/uploading/processing/generating)"""
+        job.set_stage("queued for analysis")
+        async with self.gemini_throttle:
+            return await gemini_service.analyze_video_async(video_abs_path, on_stage=job.set_stage)
+
+    async def _analyze_frames(
+        self,
+        job: ExtractionJob,
+        gemini_service: GeminiService,
+        video_abs_path: str
+    ) -> Optional[Dict]:
+        """
+        Frames mode: send scene-change keyframes inline (no upload or ACTIVE wait).
+        Returns None when the result isn't confident enough, so the caller escalates
+        to full-video analysis.
+        """
+        job.set_stage("sampling frames")
+        frames = await asyncio.to_thread(
+            self.video_downloader.extract_video_frames, video_abs_path, FRAMES_MODE_COUNT, "scene"
+        )
+        if not len(frames):
+            print("No frames could be sampled; escalating to full video analysis")
+            return None
+
+        job.set_stage("queued for analysis")
+        try:
+            async with self.gemini_throttle:
+                job.set_stage("analyzing frames")
+                recipe_data = await gemini_service.analyze_frames_async(frames)
+        except Exception as e:
+            print(f"Frame analysis failed ({str(e)}); escalating to full video analysis")
+            return None
+
+        return self._accept_if_confident(recipe_data, FRAMES_MIN_CONFIDENCE, "Frame")
+
+    async def _analyze_transcript(
+        self,
+        job: ExtractionJob,
+        gemini_service: GeminiService,
+        video_abs_path: str
+    ) -> Optional[Dict]:
+        """
+        Transcript mode: caption + subtitle text (or the narration audio when there
+        are no subtitles) + a few small frames, sent inline with the video prompt.
+        Returns None to escalate to full-video analysis.
+        """
+        job.set_stage("collecting transcript")
+        context, frames = await asyncio.gather(
+            asyncio.to_thread(self.video_downloader.fetch_text_context, job.video_url),
+            asyncio.to_thread(
+                self.video_downloader.extract_video_frames,
+                video_abs_path, TRANSCRIPT_FRAME_COUNT, "uniform", TRANSCRIPT_FRAME_MAX_WIDTH
+            )
+        )
+        audio = None
+        if TRANSCRIPT_AUDIO == "always" or (TRANSCRIPT_AUDIO == "fallback" and not context["captions"]):
+            audio = await asyncio.to_thread(video_transcoder.extract_audio, video_abs_path)
+        if not (context["captions"] or audio):
+            print("No subtitles or audio available; escalating to full video analysis")
+            return None
+
+        job.set_stage("queued for analysis")
+        try:
+            async with self.gemini_throttle:
+                job.set_stage("analyzing transcript")
+                recipe_data = await gemini_service.analyze_transcript_async(
+                    context["description"], context["captions"], frames, audio
+                )
+        except Exception as e:
+            print(f"Transcript analysis failed ({str(e)}); escalating to full video analysis")
+            return None
+
+        return self._accept_if_confident(recipe_data, TRANSCRIPT_MIN_CONFIDENCE, "Transcript")
+
+    def _accept_if_confident(self, recipe_data: Dict, threshold: float, label: str) -> Optional[Dict]:
+        confidence = extraction_confidence(recipe_data)
+        if confidence < threshold:
+            print(f"{label} analysis confidence {confidence:.2f} < {threshold:.2f}; "
+                  f"escalating to full video analysis")
+            return None
+        recipe_data.pop("confidence", None)
+        return recipe_data
+
+    async def _extract_streamed(self, job: ExtractionJob) -> Tuple[str, None, Optional[str], Dict]:
+        """Download into a memory buffer and upload from it (STREAM_DOWNLOADS); no video file is kept"""
+        streamed = None
+        try:
+            job.set_stage("downloading")
+            async with self._download_throttle(job.video_url):
+                streamed = await asyncio.to_thread(self.video_downloader.download_video_stream, job.video_url)
+
+            gemini_service = GeminiService(
+                model_name=job.model_name, tier=job.tier, on_partial=self._partial_callback(job)
+            )
+            job.set_stage("queued for analysis")
+            async with self.gemini_throttle:
+                recipe_data = await gemini_service.analyze_video_stream_async(streamed, on_stage=job.set_stage)
+            return streamed.platform, None, streamed.thumbnail_path, recipe_data
+        finally:
+            if streamed is not None:
+                streamed.close()
+
+    def _partial_callback(self, job: ExtractionJob):
+        """Stream generation with partial-field events only when a client follows the job"""
+        return job.publish_partial if job.stream_partials else None
+
+    def _download_throttle(self, video_url: str) -> Throttle:
+        try:
+            platform = self.video_downloader.detect_platform(video_url)
+        except ValueError:
+            platform = None
+        return self.download_throttles.get(platform, self.download_throttle)
+
+    def _find_existing(self, video_url: str, canonical_id: Optional[str]) -> Optional[int]:
+        db = self.session_factory()
+        try:
+            return find_existing_recipe_id(db, video_url, canonical_id)
+        finally:
+            db.close()
+
+    def _save_recipe(
+        self,
+        video_url: str,
+        canonical_id: Optional[str],
+        platform: str,
+        video_path: Optional[str],
+        thumbnail_path: Optional[str],
+        recipe_data: Dict
+    ) -> Tuple[int, Optional[schemas.Recipe]]:
+        """
+        Save the recipe and return (id, response model). If another process stored
+        the same video first, its id is returned with no model.
+        """
+        # Store links are pure URL building, so compute them before opening the transaction
+        ingredients = [
+            {**ing_data, "store_links": self.store_scraper.find_ingredient_stores(ing_data['name'])}
+            for ing_data in recipe_data.get('ingredients') or []
+        ]
+        # Resized WebP/JPEG copies for the gallery
+        thumbnails = self.video_downloader.create_thumbnail_variants(thumbnail_path)
+
+        db = self.session_factory()
+        try:
+            recipe = save_recipe(
+                db,
+                {**recipe_data, "ingredients": ingredients},
+                video_url=video_url,
+                platform=platform,
+                canonical_id=canonical_id,
+                video_path=video_path,
+                thumbnail_path=thumbnail_path,
+                thumbnails=thumbnails
+            )
+            db.commit()
+            return recipe.id, recipe
+        except IntegrityError:
+            # Another process stored this video first; share its recipe
+            db.rollback()
+            existing_id = find_existing_recipe_id(db, video_url, canonical_id)
+            if existing_id is None:
+                raise
+            return existing_id, None
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def find_existing_recipe_id(db: Session, video_url: str, canonical_id: Optional[str] = None) -> Optional[int]:
+    """
+    Return the id of a recipe already extracted from this video, if any.
+    Matches on the canonical video identity so URL variants hit, and on the raw
+    URL for rows stored before canonical ids existed.
+    """
+    match = models.Recipe.video_url == video_url
+    if canonical_id:
+        match = or_(models.Recipe.canonical_id == canonical_id, match)
+    row = db.query(models.Recipe.id).filter(match).first()
+    return row[0] if row else None
+
+
+def find_existing_recipe_ids(db: Session, videos: List[Tuple[str, Optional[str]]]) -> Dict[str, int]:
+    """
+    Batch form of find_existing_recipe_id for (video_url, canonical_id) pairs, in one query.
+    Returns {canonical_id or video_url: recipe_id} for the videos already stored.
+    """
+    if not videos:
+        return {}
+    urls = [video_url for video_url, _ in videos]
+    canonical_ids = [canonical_id for _, canonical_id in videos if canonical_id]
+
+    match = models.Recipe.video_url.in_(urls)
+    if canonical_ids:
+        match = or_(models.Recipe.canonical_id.in_(canonical_ids), match)
+    rows = db.query(models.Recipe.id, models.Recipe.video_url, models.Recipe.canonical_id).filter(match).all()
+
+    by_url = {row.video_url: row.id for row in rows}
+    by_canonical = {row.canonical_id: row.id for row in rows if row.canonical_id}
+    existing = {}
+    for video_url, canonical_id in videos:
+        recipe_id = by_canonical.get(canonical_id) if canonical_id else None
+        if recipe_id is None:
+            recipe_id = by_url.get(video_url)
+        if recipe_id is not None:
+            existing[canonical_id or video_url] = recipe_id
+    return existing
@@ -0,0 +1,201 @@
+"""
+Single-pass frame sampling with OpenCV.
+Seeking with CAP_PROP_POS_FRAMES costs a keyframe seek plus decode-forward per
+sample on H.264, and CAP_PROP_FRAME_COUNT is often wrong for TikTok files, so
+frames are read in one linear pass: grab() walks the stream, and only the frames
+that are kept are retrieve()d (decoded to BGR) and resized straight into a
+preallocated array.
+"""
+import heapq
+from typing import List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+
+# Uniform mode buffers this many candidates per requested frame; more candidates
+# bring the chosen frames closer to even spacing at the cost of memory
+UNIFORM_OVERSAMPLE = 4
+
+
+class SampledFrames:
+    """
+    Frames as one (n, height, width, 3) uint8 BGR array plus the timestamp
+    (seconds) of each frame. Iterating and slicing behave like the array.
+    """
+
+    def __init__(self, frames: np.ndarray, timestamps: List[float]):
+        self.frames = frames
+        self.timestamps = timestamps
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+
+class FrameSampler:
+    """
+    Samples frames from a video file in one sequential decode.
+    max_width downscales each kept frame as it is decoded (never upscales).
+
+    Modes:
+        uniform    - num_frames spread evenly over the whole video, without trusting the frame count
+        timestamps - the frame at or just after each requested time (seconds)
+        scene      - up to num_frames frames where the picture changes most (cuts, new ingredients)
+    """
+
+    def __init__(self, max_width: Optional[int] = 768, scene_fps: float = 2.0, scene_threshold: float = 12.0):
+        self.max_width = max_width
+        # Scene detection compares frames at this rate rather than every decoded frame
+        self.scene_fps = scene_fps
+        # Mean absolute difference (0-255) of 64x36 grayscale copies that counts as a change
+        self.scene_threshold = scene_threshold
+
+    def sample(
+        self,
+        video_path: str,
+        num_frames: int = 10,
+        mode: str = "uniform",
+        timestamps: Optional[Sequence[float]] = None
+    ) -> SampledFrames:
+        vidcap = cv2.VideoCapture(video_path)
+        try:
+            if not vidcap.isOpened():
+                raise ValueError(f"Could not open video: {video_path}")
+            if mode == "uniform":
+                return self._sample_uniform(vidcap, num_frames)
+            if mode == "timestamps":
+                return self._sample_timestamps(vidcap, sorted(timestamps or []))
+            if mode == "scene":
+                return self._sample_scenes(vidcap, num_frames)
+            raise ValueError(f"Unknown sampling mode: {mode}")
+        finally:
+            vidcap.release()
+
+    def _output_size(self, vidcap) -> tuple:
+        width = int(vidcap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(vidcap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if self.max_width and width > self.max_width:
+            height = max(1, int(height * self.max_width / width))
+            width = self.max_width
+        return width, height
+
+    def _retrieve_into(self, vidcap, out: np.ndarray) -> bool:
+        """Decode the grabbed frame into `out` (resized if needed)"""
+        success, frame = vidcap.retrieve()
+        if not success:
+            return False
+        height, width = out.shape[:2]
+        if frame.shape[0] == height and frame.shape[1] == width:
+            out[...] = frame
+        else:
+            cv2.resize(frame, (width, height), dst=out, interpolation=cv2.INTER_AREA)
+        return True
+
+    @staticmethod
+    def _position_seconds(vidcap, index: int, fps: float) -> float:
+        msec = vidcap.get(cv2.CAP_PROP_POS_MSEC)
+        return msec / 1000.0 if msec > 0 else index / fps
+
+    def _sample_uniform(self, vidcap, num_frames: int) -> SampledFrames:
+        """
+        Keep every `stride`-th frame in a buffer of UNIFORM_OVERSAMPLE * num_frames
+        slots; when the buffer fills, drop every other kept frame and double the
+        stride. The buffer then holds evenly spaced candidates whatever the real
+        length, and for each of num_frames evenly spaced target times the nearest
+        candidate is taken (off by at most half a candidate gap).
+        """
+        width, height = self._output_size(vidcap)
+        fps = vidcap.get(cv2.CAP_PROP_FPS) or 30.0
+        capacity = max(2, UNIFORM_OVERSAMPLE * num_frames)
+        buffer = np.empty((capacity, height, width, 3), dtype=np.uint8)
+        times = []
+        stride, index, count = 1, 0, 0
+
+        while vidcap.grab():
+            if index % stride == 0:
+                if count == capacity:
+                    buffer[:capacity // 2] = buffer[0:capacity:2]
+                    times = times[0:capacity:2]
+                    count = capacity // 2
+                    # index == capacity * old stride, so it is a multiple of the new stride too
+                    stride *= 2
+                if self._retrieve_into(vidcap, buffer[count]):
+                    times.append(self._position_seconds(vidcap, index, fps))
+                    count += 1
+            index += 1
+
+        if count > num_frames:
+            candidate_times = np.asarray(times[:count])
+            targets = np.linspace(candidate_times[0], candidate_times[-1], num_frames)
+            keep = np.abs(candidate_times[None, :] - targets[:, None]).argmin(axis=1)
+            return SampledFrames(buffer[keep], [times[i] for i in keep])
+        return SampledFrames(buffer[:count].copy(), times[:count])
+
+    def _sample_timestamps(self, vidcap, targets: List[float]) -> SampledFrames:
+        width, height = self._output_size(vidcap)
+        fps = vidcap.get(cv2.CAP_PROP_FPS) or 30.0
+        buffer = np.empty((len(targets), height, width, 3), dtype=np.uint8)
+        times = []
+        index = 0
+
+        while len(times) < len(targets) and vidcap.grab():
+            position = self._position_seconds(vidcap, index, fps)
+            if position >= targets[len(times)]:
+                slot = len(times)
+                if self._retrieve_into(vidcap, buffer[slot]):
+                    times.append(position)
+                    # Later targets that also fall before this frame reuse it
+                    while len(times) < len(targets) and position >= targets[len(times)]:
+                        buffer[len(times)] = buffer[slot]
+                        times.append(position)
+            index += 1
+
+        return SampledFrames(buffer[:len(times)], times)
+
+    def _sample_scenes(self, vidcap, num_frames: int) -> SampledFrames:
+        """
+        Compare small grayscale copies ~scene_fps times per second; frames that differ
+        from the previous comparison by more than scene_threshold are candidates, and
+        the num_frames biggest changes (plus the opening frame) are kept in time order.
+        """
+        width, height = self._output_size(vidcap)
+        fps = vidcap.get(cv2.CAP_PROP_FPS) or 30.0
+        step = max(1, int(round(fps / self.scene_fps)))
+        # Min-heap of (change score, index, frame slot); slots are reused when a candidate is evicted
+        buffer = np.empty((max(1, num_frames), height, width, 3), dtype=np.uint8)
+        free_slots = list(range(len(buffer)))
+        heap = []
+        times = {}
+        previous = None
+        index = 0
+        scratch = np.empty((height, width, 3), dtype=np.uint8)
+
+        while vidcap.grab():
+            if index % step == 0 and self._retrieve_into(vidcap, scratch):
+                small = cv2.resize(cv2.cvtColor(scratch, cv2.COLOR_BGR2GRAY), (64, 36), interpolation=cv2.INTER_AREA)
+                # The opening frame always qualifies, so even a single-shot video yields a frame
+                change = float("inf") if previous is None else float(cv2.absdiff(small, previous).mean())
+                previous = small
+                if change >= self.scene_threshold:
+                    if free_slots:
+                        slot = free_slots.pop()
+                    elif heap and change > heap[0][0]:
+                        _, evicted_index, slot = heapq.heappop(heap)
+                        times.pop(evicted_index)
+                    else:
+                        slot = None
+                    if slot is not None:
+                        buffer[slot] = scratch
+                        heapq.heappush(heap, (change, index, slot))
+                        times[index] = self._position_seconds(vidcap, index, fps)
+            index += 1
+
+        chosen = sorted((frame_index, slot) for _, frame_index, slot in heap)
+        slots = [slot for _, slot in chosen]
+        return SampledFrames(buffer[slots], [times[frame_index] for frame_index, _ in chosen])
@@ -0,0 +1,70 @@
+import itertools
+import os
+import threading
+from typing import Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+load_dotenv()
+
+
+class GeminiClientPool:
+    """
+    Process-wide registry of long-lived genai.Client objects, one per API key.
+    Each client keeps its own keep-alive HTTP connection pool, so steady-state
+    requests skip TLS and connection setup. Keys are handed out round-robin to
+    spread quota across projects.
+    """
+
+    def __init__(self, api_keys: List[str]):
+        if not api_keys:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        self.api_keys = api_keys
+        self._clients: Dict[str, genai.Client] = {}
+        self._next_key = itertools.cycle(api_keys)
+        self._lock = threading.Lock()
+
+    def _build_client(self, api_key: str) -> genai.Client:
+        max_connections = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=float(os.getenv("GEMINI_KEEPALIVE_SECONDS", "120"))
+        )
+        # The aio client is what the pipeline uses. Giving it an httpx transport applies
+        # the same limits there and keeps the SDK off its own unbounded aiohttp session.
+        return genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(
+                client_args={"limits": limits},
+                async_client_args={"transport": httpx.AsyncHTTPTransport(limits=limits)}
+            )
+        )
+
+    def next_client(self) -> genai.Client:
+        """Return the client for the next API key in rotation (created on first use)"""
+        with self._lock:
+            api_key = next(self._next_key)
+            client = self._clients.get(api_key)
+            if client is None:
+                client = self._build_client(api_key)
+                self._clients[api_key] = client
+            return client
+
+
+_pool: Optional[GeminiClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> GeminiClientPool:
+    """Shared pool, configured from GEMINI_API_KEYS (comma-separated) or GEMINI_API_KEY"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                raw_keys = os.getenv("GEMINI_API_KEYS") or os.getenv("GEMINI_API_KEY") or ""
+                _pool = GeminiClientPool([key.strip() for key in raw_keys.split(",") if key.strip()])
+    return _pool
@@ -1,252 +1,621 @@
 from google import genai
 from google.genai import types
+import asyncio
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import json
-from typing import Dict, List, Optional
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
 import cv2
-from PIL import Image
-import io
+
+from ..schemas import NutritionInfoBase, RecipeExtraction, ScoredRecipeExtraction
+from .cache import JsonFileCache
+from .gemini_client_pool import get_client_pool
+from .json_repair import StreamedObjectScanner, parse_json_lenient
+from .metrics import file_processing_metrics
+from .video_downloader import StreamedVideo
+from .video_transcoder import VideoTranscoder, video_transcoder
 
 load_dotenv()
 
+# Bump whenever the video analysis prompt or generation config changes,
+# so cached results produced by the old prompt are no longer served
+VIDEO_PROMPT_VERSION = "video-v2"
+
+# Parsed analysis results keyed by video content fingerprint + model + prompt version
+_analysis_cache = None
+if os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true":
+    _analysis_cache = JsonFileCache(
+        Path(__file__).resolve().parents[2] / "data" / "cache" / "analysis",
+        max_bytes=int(os.getenv("ANALYSIS_CACHE_MAX_MB", "100")) * 1024 * 1024
+    )
+
+
+# Ask for schema-constrained JSON (response_schema from the pydantic models in schemas.py)
+STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+
+def fingerprint_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Streaming SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+VIDEO_PROMPT = """
+Analyze this cooking video and extract the following information in a structured JSON format:
+
+{
+    "title": "Name of the dish",
+    "description": "Brief description of the dish",
+    "ingredients": [
+        {
+            "name": "ingredient name",
+            "quantity": "amount",
+            "unit": "measurement unit (e.g., cups, grams, pieces)"
+        }
+    ],
+    "steps": [
+        {
+            "step_number": 1,
+            "instruction": "Detailed cooking instruction",
+            "duration": "estimated time for this step (e.g., '5 minutes')"
+        }
+    ],
+    "nutrition": {
+        "calories": estimated_calories_per_serving,
+        "protein": protein_in_grams,
+        "carbs": carbs_in_grams,
+        "fats": fats_in_grams,
+        "fiber": fiber_in_grams,
+        "servings": number_of_servings
+    }
+}
+
+Instructions:
+- Pay attention to both visual cues and any narration/text in the video
+- Extract all ingredients mentioned or shown, with their quantities
+- List cooking steps in chronological order
+- Include estimated time for each step if mentioned or visible
+- Provide nutritional estimates based on the ingredients and portions shown
+- If exact quantities aren't shown, provide reasonable estimates based on what you see
+- If nutritional information cannot be determined, provide null for those fields
+
+Return ONLY the JSON object, no additional text.
+"""
+
+FRAMES_PROMPT = """
+Analyze these frames from a cooking video and extract recipe information.
+These frames show different stages of cooking the same dish.
+
+Extract the following in JSON format:
+{
+    "title": "Name of the dish",
+    "description": "Brief description",
+    "ingredients": [
+        {"name": "ingredient", "quantity": "amount", "unit": "unit"}
+    ],
+    "steps": [
+        {"step_number": 1, "instruction": "step description", "duration": "time"}
+    ],
+    "nutrition": {
+        "calories": null,
+        "protein": null,
+        "carbs": null,
+        "fats": null,
+        "fiber": null,
+        "servings": null
+    },
+    "confidence": 0.0
+}
+
+Focus on:
+- Ingredients visible in the frames
+- Cooking techniques and steps shown
+- Any text overlays with ingredient lists or instructions
+
+Set "confidence" between 0 and 1 for how completely these frames alone capture the
+recipe: near 1 when ingredients and steps are clearly shown or written on screen,
+low when important details were probably only spoken or happen between frames.
+
+Return ONLY the JSON object.
+"""
+
+# Transcript mode reuses VIDEO_PROMPT, with the video replaced by its text,
+# narration audio and a few frames
+TRANSCRIPT_PROMPT_PREFIX = """
+Instead of the full video you are given material from it: the poster's caption,
+a transcript of its subtitles and/or the narration audio, and a few frames
+labelled with their timestamps. Treat them together as the video.
+"""
+
+CONFIDENCE_INSTRUCTION = """
+Also include a top-level "confidence" number between 0 and 1 for how completely
+this material captures the recipe (low if quantities or steps had to be guessed).
+"""
+
+NUTRITION_PROMPT = """
+Based on these ingredients, estimate the nutritional information per serving:
+
+Ingredients:
+{ingredients_text}
+
+Provide the response in JSON format:
+{{
+    "calories": estimated_calories_per_serving,
+    "protein": protein_in_grams,
+    "carbs": carbs_in_grams,
+    "fats": fats_in_grams,
+    "fiber": fiber_in_grams,
+    "servings": estimated_number_of_servings
+}}
+
+Use standard nutritional data for these ingredients. If you cannot estimate, use null.
+Return ONLY the JSON object.
+"""
+
+EMPTY_NUTRITION = {
+    "calories": None,
+    "protein": None,
+    "carbs": None,
+    "fats": None,
+    "fiber": None,
+    "servings": None
+}
+
+# Uploaded files must become ACTIVE before they can be used in a prompt. Short clips
+# are ready within a second, so status is checked quickly at first and then with
+# jittered exponential backoff, up to a deadline.
+FILE_ACTIVE_DEADLINE = float(os.getenv("GEMINI_FILE_DEADLINE_SECONDS", "120"))
+FILE_POLL_FIRST_DELAY = float(os.getenv("GEMINI_POLL_FIRST_SECONDS", "0.3"))
+FILE_POLL_MAX_DELAY = float(os.getenv("GEMINI_POLL_MAX_SECONDS", "8"))
+FILE_POLL_BACKOFF = 1.7
+
+
+def file_poll_delays(deadline: float = None):
+    """Yield sleep durations between file status checks until the deadline passes"""
+    stop_at = time.monotonic() + (FILE_ACTIVE_DEADLINE if deadline is None else deadline)
+    delay = FILE_POLL_FIRST_DELAY
+    while True:
+        remaining = stop_at - time.monotonic()
+        if remaining <= 0:
+            return
+        yield min(delay * random.uniform(0.8, 1.2), remaining)
+        delay = min(delay * FILE_POLL_BACKOFF, FILE_POLL_MAX_DELAY)
+
+
+MEDIA_RESOLUTIONS = {
+    "low": types.MediaResolution.MEDIA_RESOLUTION_LOW,
+    "medium": types.MediaResolution.MEDIA_RESOLUTION_MEDIUM,
+    "high": types.MediaResolution.MEDIA_RESOLUTION_HIGH,
+}
+
+# Frame mode: inline JPEGs are re-encoded at lower quality until they fit the budget
+FRAMES_JPEG_QUALITY = int(os.getenv("FRAMES_JPEG_QUALITY", "80"))
+FRAMES_MAX_TOTAL_BYTES = int(os.getenv("FRAMES_MAX_TOTAL_KB", "1500")) * 1024
+# Unset: frames use the tier's media resolution
+FRAMES_MEDIA_RESOLUTION = MEDIA_RESOLUTIONS.get(os.getenv("FRAMES_MEDIA_RESOLUTION", "").lower())
+
+
+class GenerationTier:
+    """Thinking level, output budget, media resolution and temperature for one extraction tier"""
+
+    def __init__(
+        self,
+        name: str,
+        thinking_level: types.ThinkingLevel,
+        max_output_tokens: int,
+        media_resolution: types.MediaResolution,
+        temperature: float
+    ):
+        self.name = name
+        self.thinking_level = thinking_level
+        self.max_output_tokens = max_output_tokens
+        self.media_resolution = media_resolution
+        self.temperature = temperature
+
+
+# HIGH thinking dominates per-recipe latency, so only 'deep' (the previous fixed
+# settings) uses it
+GENERATION_TIERS = {
+    "fast": GenerationTier("fast", types.ThinkingLevel.LOW, 4096, MEDIA_RESOLUTIONS["low"], 0.4),
+    "standard": GenerationTier("standard", types.ThinkingLevel.MEDIUM, 6144, MEDIA_RESOLUTIONS["medium"], 0.5),
+    "deep": GenerationTier("deep", types.ThinkingLevel.HIGH, 8192, MEDIA_RESOLUTIONS["high"], 0.7),
+}
+
+# 'auto' runs the tiers in this order, moving up only when the parsed result fails validate_recipe
+AUTO_TIER_ORDER = ("fast", "standard", "deep")
+
+
+def tier_ladder(tier: str) -> List[GenerationTier]:
+    """Tiers to try, in order, for a requested tier name ('fast', 'standard', 'deep' or 'auto')"""
+    if tier == "auto":
+        return [GENERATION_TIERS[name] for name in AUTO_TIER_ORDER]
+    if tier not in GENERATION_TIERS:
+        raise ValueError(f"Unknown extraction tier: {tier}")
+    return [GENERATION_TIERS[tier]]
+
+
+# Keys every list item needs before it can be saved (crud.save_recipe indexes them directly)
+REQUIRED_ITEM_KEYS = {"ingredients": "name", "steps": "instruction"}
+
+
+def drop_incomplete_items(recipe_data) -> None:
+    """
+    Remove ingredients without a name and steps without an instruction, in place.
+    These are typically the item a truncated response was cut off in, which the
+    JSON repair closes rather than discards.
+    """
+    if not isinstance(recipe_data, dict):
+        return
+    for field, required in REQUIRED_ITEM_KEYS.items():
+        items = recipe_data.get(field)
+        if isinstance(items, list):
+            recipe_data[field] = [
+                item for item in items
+                if isinstance(item, dict) and str(item.get(required) or "").strip()
+            ]
+
+
+def validate_recipe(recipe_data) -> List[str]:
+    """Problems that make a parsed extraction unusable (empty list when it is fine)"""
+    if not isinstance(recipe_data, dict):
+        return ["response is not a JSON object"]
+    problems = []
+    if not str(recipe_data.get("title") or "").strip():
+        problems.append("missing title")
+    ingredients = recipe_data.get("ingredients")
+    if not isinstance(ingredients, list) or not ingredients:
+        problems.append("no ingredients")
+    elif not all(isinstance(ing, dict) and str(ing.get("name") or "").strip() for ing in ingredients):
+        problems.append("ingredient without a name")
+    steps = recipe_data.get("steps")
+    if not isinstance(steps, list) or not steps:
+        problems.append("no steps")
+    elif not all(isinstance(step, dict) and str(step.get("instruction") or "").strip() for step in steps):
+        problems.append("step without an instruction")
+    return problems
+
+
+def extraction_confidence(recipe_data: Dict) -> float:
+    """
+    How far a reduced-input (frames or transcript) result can be trusted: the
+    model's self-reported confidence, capped when the recipe is structurally thin.
+    """
+    try:
+        confidence = float(recipe_data.get("confidence", 0.5))
+    except (TypeError, ValueError):
+        confidence = 0.5
+    ingredients = recipe_data.get("ingredients") or []
+    steps = recipe_data.get("steps") or []
+    if len(ingredients) < 2 or not steps:
+        confidence = min(confidence, 0.3)
+    if not recipe_data.get("title"):
+        confidence = min(confidence, 0.5)
+    return max(0.0, min(1.0, confidence))
+
+
+def encode_frames_jpeg(frames, quality: int = None, max_total_bytes: int = None) -> List[bytes]:
+    """
+    JPEG-encode BGR frames in parallel (cv2.imencode releases the GIL), lowering
+    quality in steps until the whole batch fits max_total_bytes (floor: quality 40).
+    """
+    quality = quality or FRAMES_JPEG_QUALITY
+    max_total_bytes = max_total_bytes or FRAMES_MAX_TOTAL_BYTES
+    frames = list(frames)
+    if not frames:
+        return []
+
+    def encode(frame, q):
+        success, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, q])
+        if not success:
+            raise ValueError("Failed to encode frame as JPEG")
+        return buffer.tobytes()
+
+    with ThreadPoolExecutor(max_workers=min(8, len(frames))) as pool:
+        while True:
+            encoded = list(pool.map(lambda frame: encode(frame, quality), frames))
+            if sum(len(data) for data in encoded) <= max_total_bytes or quality <= 40:
+                return encoded
+            quality = max(40, quality - 15)
+
+
+class PartialRecipeEmitter:
+    """
+    Follows a streamed recipe response and reports each top-level field, and each
+    ingredient or step, once it is complete - title, then ingredients, then steps
+    as the model writes them.
+    """
+
+    FIELDS = ("title", "description", "ingredients", "steps", "nutrition")
+
+    def __init__(self, on_partial: Callable[[Dict], None]):
+        self.on_partial = on_partial
+        # Scans each chunk once, so the cost stays linear in the response length
+        self.scanner = StreamedObjectScanner()
+
+    @property
+    def text(self) -> str:
+        return self.scanner.text
+
+    def feed(self, chunk: str):
+        for field, index, value in self.scanner.feed(chunk):
+            if field not in self.FIELDS:
+                continue
+            if index is not None:
+                self.on_partial({"field": field, "index": index, "value": value})
+            elif not isinstance(value, list):
+                # Lists were already reported item by item
+                self.on_partial({"field": field, "value": value})
+
+
+def _file_done(video_file) -> bool:
+    return video_file.state.name in ("ACTIVE", "FAILED")
 
-class GeminiService:
-    def __init__(self, model_name: str = 'gemini-3-flash-preview'):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
 
-        # Initialize Gemini 3 client with new SDK
-        self.client = genai.Client(api_key=api_key)
+class GeminiService:
+    """
+    Recipe extraction with Gemini 3. Every analysis has a blocking form for worker
+    threads and an *_async form built on the SDK's aio client, which polls with
+    asyncio.sleep and can be cancelled without tying up a thread.
+    """
+
+    def __init__(
+        self,
+        model_name: str = 'gemini-3-flash-preview',
+        client: Optional[genai.Client] = None,
+        transcoder: Optional[VideoTranscoder] = None,
+        tier: str = "deep",
+        on_partial: Optional[Callable[[Optional[Dict]], None]] = None
+    ):
+        # Lightweight model-bound handle; the Gemini 3 client comes from the shared
+        # pool (one long-lived connection pool per API key, rotated round-robin)
+        self.client = client or get_client_pool().next_client()
+        # Downscales videos before upload (TRANSCODE_* settings)
+        self.transcoder = transcoder or video_transcoder
         # Support both Gemini 3 Pro and Flash
         self.model_name = model_name
-
-    def analyze_video(self, video_path: str, frames: List = None) -> Dict:
+        # Extraction tier ('fast', 'standard', 'deep' or 'auto'); see GENERATION_TIERS
+        self.tier = tier
+        self.tiers = tier_ladder(tier)
+        # When set, async recipe generation is streamed and complete fields are passed
+        # here as they arrive (None when a new attempt starts); see PartialRecipeEmitter
+        self.on_partial = on_partial
+
+    def analyze_video(
+        self,
+        video_path: str,
+        frames: List = None,
+        on_stage: Optional[Callable[[str], None]] = None
+    ) -> Dict:
         """
         Analyze cooking video and extract recipe information using Gemini 3
         Returns structured recipe data
+        on_stage is called with "transcoding", "uploading", "processing" and "generating" as the call progresses
+        Results are cached by video content, so reposts of the same file skip upload and generation.
         """
+        report_stage = on_stage or (lambda stage: None)
+        upload_path = video_path
         try:
+            # Keyed by the original file, so cache hits skip transcoding too
+            cache_key = self._video_cache_key(video_path)
+            cached = _analysis_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                print(f"Analysis cache hit for {video_path}")
+                return cached
+
+            report_stage("transcoding")
+            upload_path = self.transcoder.transcode(video_path) or video_path
+
             # Upload video file to Gemini using new SDK
-            print(f"Uploading video file: {video_path}")
-            video_file = self.client.files.upload(file=video_path)
+            report_stage("uploading")
+            print(f"Uploading video file: {upload_path}")
+            upload_started = time.monotonic()
+            video_file = self.client.files.upload(file=upload_path)
+            upload_seconds = time.monotonic() - upload_started
             print(f"Video uploaded. File ID: {video_file.name}, State: {video_file.state}")
 
             # Wait for file to be processed and become ACTIVE
-            import time
-            max_wait = 120  # Maximum 2 minutes wait
-            wait_interval = 2  # Check every 2 seconds
-            elapsed = 0
-
-            while video_file.state.name != "ACTIVE" and elapsed < max_wait:
-                print(f"Waiting for file to be processed... State: {video_file.state.name}")
-                time.sleep(wait_interval)
-                elapsed += wait_interval
+            report_stage("processing")
+            processing_started = time.monotonic()
+            polls = 0
+            for delay in file_poll_delays():
+                if _file_done(video_file):
+                    break
+                time.sleep(delay)
                 # Refresh file status
                 video_file = self.client.files.get(name=video_file.name)
-
-            if video_file.state.name != "ACTIVE":
-                raise Exception(f"Video file did not become ACTIVE within {max_wait} seconds. Current state: {video_file.state.name}")
-
-            print(f"File is now ACTIVE. Proceeding with analysis...")
-
-            prompt = """
-            Analyze this cooking video and extract the following information in a structured JSON format:
-
-            {
-                "title": "Name of the dish",
-                "description": "Brief description of the dish",
-                "ingredients": [
-                    {
-                        "name": "ingredient name",
-                        "quantity": "amount",
-                        "unit": "measurement unit (e.g., cups, grams, pieces)"
-                    }
-                ],
-                "steps": [
-                    {
-                        "step_number": 1,
-                        "instruction": "Detailed cooking instruction",
-                        "duration": "estimated time for this step (e.g., '5 minutes')"
-                    }
-                ],
-                "nutrition": {
-                    "calories": estimated_calories_per_serving,
-                    "protein": protein_in_grams,
-                    "carbs": carbs_in_grams,
-                    "fats": fats_in_grams,
-                    "fiber": fiber_in_grams,
-                    "servings": number_of_servings
-                }
-            }
-
-            Instructions:
-            - Pay attention to both visual cues and any narration/text in the video
-            - Extract all ingredients mentioned or shown, with their quantities
-            - List cooking steps in chronological order
-            - Include estimated time for each step if mentioned or visible
-            - Provide nutritional estimates based on the ingredients and portions shown
-            - If exact quantities aren't shown, provide reasonable estimates based on what you see
-            - If nutritional information cannot be determined, provide null for those fields
-
-            Return ONLY the JSON object, no additional text.
-            """
-
-            # Gemini 3 configuration with HIGH thinking level for deep reasoning
-            config = types.GenerateContentConfig(
-                temperature=0.7,
-                top_p=0.95,
-                max_output_tokens=8192,
-                thinking_config=types.ThinkingConfig(
-                    thinking_level=types.ThinkingLevel.HIGH
-                )
+                polls += 1
+            self._record_processing(video_file, os.path.getsize(upload_path), upload_seconds, processing_started, polls)
+            self._ensure_active(video_file)
+
+            # Generate content using new SDK (escalating through the tiers for 'auto')
+            report_stage("generating")
+            recipe_data = self._generate_tiered(
+                [VIDEO_PROMPT, video_file], self._video_config, report_stage
             )
 
-            # Generate content using new SDK
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=[prompt, video_file],
-                config=config
-            )
-
-            # Parse the JSON response
-            recipe_data = self._parse_json_response(response.text)
+            if cache_key is not None:
+                _analysis_cache.set(cache_key, recipe_data)
 
             return recipe_data
 
         except Exception as e:
             raise Exception(f"Failed to analyze video with Gemini 3: {str(e)}")
+        finally:
+            self._cleanup_transcoded(video_path, upload_path)
+
+    async def analyze_video_async(
+        self,
+        video_path: str,
+        frames: List = None,
+        on_stage: Optional[Callable[[str], None]] = None
+    ) -> Dict:
+        """
+        Async analyze_video on the SDK's aio client.
+        If the task is cancelled after upload, the uploaded file is deleted before re-raising.
+        """
+        report_stage = on_stage or (lambda stage: None)
+        upload_path = video_path
+        try:
+            cache_key = await asyncio.to_thread(self._video_cache_key, video_path)
+            cached = await asyncio.to_thread(_analysis_cache.get, cache_key) if cache_key else None
+            if cached is not None:
+                print(f"Analysis cache hit for {video_path}")
+                return cached
+
+            report_stage("transcoding")
+            upload_path = await asyncio.to_thread(self.transcoder.transcode, video_path) or video_path
+
+            print(f"Uploading video file: {upload_path}")
+            return await self._upload_and_generate_async(
+                upload_path, os.path.getsize(upload_path), None, cache_key, report_stage
+            )
 
-    def analyze_frames(self, frames: List, video_description: str = None) -> Dict:
+        except Exception as e:
+            raise Exception(f"Failed to analyze video with Gemini 3: {str(e)}")
+        finally:
+            self._cleanup_transcoded(video_path, upload_path)
+
+    async def analyze_video_stream_async(
+        self,
+        streamed: StreamedVideo,
+        on_stage: Optional[Callable[[str], None]] = None
+    ) -> Dict:
         """
-        Analyze individual frames from video using Gemini 3
-        Useful as a fallback or supplement to video analysis
-        Uses HIGH media resolution for detailed ingredient identification
+        analyze_video_async for a video held in memory (or a spilled temp file).
+        The buffer is uploaded as-is: transcoding needs a file on disk, and the
+        format policy already picks a small rendition for streamed downloads.
         """
+        report_stage = on_stage or (lambda stage: None)
         try:
-            # Convert frames to image parts
-            image_parts = []
-            for frame in frames[:5]:  # Use first 5 frames
-                # Convert BGR to RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                # Convert to PIL Image
-                pil_image = Image.fromarray(frame_rgb)
-                # Convert to bytes
-                img_byte_arr = io.BytesIO()
-                pil_image.save(img_byte_arr, format='JPEG')
-                img_byte_arr = img_byte_arr.getvalue()
-
-                # Create Part from bytes
-                image_part = types.Part.from_bytes(
-                    data=img_byte_arr,
-                    mime_type='image/jpeg'
-                )
-                image_parts.append(image_part)
-
-            prompt = """
-            Analyze these frames from a cooking video and extract recipe information.
-            These frames show different stages of cooking the same dish.
-
-            Extract the following in JSON format:
-            {
-                "title": "Name of the dish",
-                "description": "Brief description",
-                "ingredients": [
-                    {"name": "ingredient", "quantity": "amount", "unit": "unit"}
-                ],
-                "steps": [
-                    {"step_number": 1, "instruction": "step description", "duration": "time"}
-                ],
-                "nutrition": {
-                    "calories": null,
-                    "protein": null,
-                    "carbs": null,
-                    "fats": null,
-                    "fiber": null,
-                    "servings": null
-                }
-            }
-
-            Focus on:
-            - Ingredients visible in the frames
-            - Cooking techniques and steps shown
-            - Any text overlays with ingredient lists or instructions
-
-            Return ONLY the JSON object.
-            """
-
-            # Gemini 3 Pro: Use HIGH media resolution for detailed image analysis
-            config = types.GenerateContentConfig(
-                temperature=0.7,
-                top_p=0.95,
-                max_output_tokens=8192,
-                thinking_config=types.ThinkingConfig(
-                    thinking_level=types.ThinkingLevel.HIGH
-                ),
-                media_resolution=types.MediaResolution.MEDIA_RESOLUTION_HIGH
+            cache_key = self._stream_cache_key(streamed)
+            cached = await asyncio.to_thread(_analysis_cache.get, cache_key) if cache_key else None
+            if cached is not None:
+                print(f"Analysis cache hit for {streamed.platform} video {streamed.video_id}")
+                return cached
+
+            print(f"Uploading streamed video {streamed.video_id} ({streamed.size_bytes / 1e6:.1f} MB)")
+            streamed.buffer.seek(0)
+            return await self._upload_and_generate_async(
+                streamed.buffer, streamed.size_bytes, streamed.mime_type, cache_key, report_stage
             )
 
-            # Build contents with images and prompt
-            contents = image_parts + [prompt]
+        except Exception as e:
+            raise Exception(f"Failed to analyze video with Gemini 3: {str(e)}")
 
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=contents,
-                config=config
+    async def _upload_and_generate_async(
+        self,
+        upload_source,
+        size_bytes: Optional[int],
+        mime_type: Optional[str],
+        cache_key: Optional[str],
+        report_stage: Callable[[str], None]
+    ) -> Dict:
+        """Upload (path or binary file object), wait for ACTIVE, generate, parse and cache"""
+        video_file = None
+        try:
+            report_stage("uploading")
+            upload_started = time.monotonic()
+            upload_kwargs = {"config": {"mime_type": mime_type}} if mime_type else {}
+            video_file = await self.client.aio.files.upload(file=upload_source, **upload_kwargs)
+            upload_seconds = time.monotonic() - upload_started
+            print(f"Video uploaded. File ID: {video_file.name}, State: {video_file.state}")
+
+            report_stage("processing")
+            processing_started = time.monotonic()
+            polls = 0
+            for delay in file_poll_delays():
+                if _file_done(video_file):
+                    break
+                await asyncio.sleep(delay)
+                video_file = await self.client.aio.files.get(name=video_file.name)
+                polls += 1
+            self._record_processing(video_file, size_bytes, upload_seconds, processing_started, polls)
+            self._ensure_active(video_file)
+
+            # The uploaded file is reused if 'auto' escalates to a higher tier
+            report_stage("generating")
+            recipe_data = await self._generate_tiered_async(
+                [VIDEO_PROMPT, video_file], self._video_config, report_stage
             )
 
-            recipe_data = self._parse_json_response(response.text)
+            if cache_key is not None:
+                await asyncio.to_thread(_analysis_cache.set, cache_key, recipe_data)
+
             return recipe_data
 
+        except asyncio.CancelledError:
+            if video_file is not None:
+                await self._delete_file_quietly(video_file.name)
+            raise
+
+    def analyze_frames(self, frames: List, video_description: str = None) -> Dict:
+        """
+        Analyze individual frames from video using Gemini 3
+        Useful as a fallback or supplement to video analysis
+        Media resolution follows the tier unless FRAMES_MEDIA_RESOLUTION is set
+        """
+        try:
+            return self._generate_tiered(self._frame_parts(frames) + [FRAMES_PROMPT], self._frames_config)
+
+        except Exception as e:
+            raise Exception(f"Failed to analyze frames with Gemini 3: {str(e)}")
+
+    async def analyze_frames_async(self, frames: List, video_description: str = None) -> Dict:
+        """Async analyze_frames on the SDK's aio client"""
+        try:
+            image_parts = await asyncio.to_thread(self._frame_parts, frames)
+            return await self._generate_tiered_async(image_parts + [FRAMES_PROMPT], self._frames_config)
+
         except Exception as e:
             raise Exception(f"Failed to analyze frames with Gemini 3: {str(e)}")
 
+    async def analyze_transcript_async(
+        self,
+        description: Optional[str],
+        captions: Optional[str],
+        frames=None,
+        audio: Optional[bytes] = None,
+        audio_mime_type: str = "audio/ogg"
+    ) -> Dict:
+        """
+        Text-first analysis: caption and subtitle text, optional narration audio and
+        a few frames sent inline with the video prompt - no video upload.
+        The result carries a "confidence" field (see extraction_confidence).
+        """
+        try:
+            contents = [TRANSCRIPT_PROMPT_PREFIX + VIDEO_PROMPT + CONFIDENCE_INSTRUCTION]
+            if description:
+                contents.append(f"Caption:\n{description}")
+            if captions:
+                contents.append(f"Subtitle transcript:\n{captions}")
+            if audio:
+                contents.append("Narration audio:")
+                contents.append(types.Part.from_bytes(data=audio, mime_type=audio_mime_type))
+            if frames is not None and len(frames):
+                contents.extend(await asyncio.to_thread(self._frame_parts, frames))
+
+            return await self._generate_tiered_async(contents, self._frames_config)
+
+        except Exception as e:
+            raise Exception(f"Failed to analyze transcript with Gemini 3: {str(e)}")
+
     def enhance_recipe_with_nutrition(self, ingredients: List[Dict]) -> Dict:
         """
         Use Gemini 3 to estimate nutritional information based on ingredients
-        Uses HIGH thinking level for accurate nutritional calculations
+        Thinking level follows the extraction tier
         """
         try:
-            ingredients_text = "\n".join([
-                f"- {ing['quantity']} {ing.get('unit', '')} {ing['name']}"
-                for ing in ingredients
-            ])
-
-            prompt = f"""
-            Based on these ingredients, estimate the nutritional information per serving:
-
-            Ingredients:
-            {ingredients_text}
-
-            Provide the response in JSON format:
-            {{
-                "calories": estimated_calories_per_serving,
-                "protein": protein_in_grams,
-                "carbs": carbs_in_grams,
-                "fats": fats_in_grams,
-                "fiber": fiber_in_grams,
-                "servings": estimated_number_of_servings
-            }}
-
-            Use standard nutritional data for these ingredients. If you cannot estimate, use null.
-            Return ONLY the JSON object.
-            """
-
-            # Gemini 3: Use HIGH thinking for precise nutritional calculations
-            config = types.GenerateContentConfig(
-                temperature=0.5,  # Lower temperature for more precise calculations
-                top_p=0.9,
-                max_output_tokens=2048,
-                thinking_config=types.ThinkingConfig(
-                    thinking_level=types.ThinkingLevel.HIGH
-                )
-            )
-
             response = self.client.models.generate_content(
                 model=self.model_name,
-                contents=prompt,
-                config=config
+                contents=self._nutrition_prompt(ingredients),
+                config=self._nutrition_config()
             )
 
             nutrition_data = self._parse_json_response(response.text)
@@ -255,34 +624,220 @@ class GeminiService:
 
         except Exception as e:
             print(f"Failed to enhance nutrition data with Gemini 3: {str(e)}")
-            return {
-                "calories": None,
-                "protein": None,
-                "carbs": None,
-                "fats": None,
-                "fiber": None,
-                "servings": None
-            }
+            return dict(EMPTY_NUTRITION)
 
-    def _parse_json_response(self, response_text: str) -> Dict:
-        """Parse JSON from Gemini response, handling markdown code blocks and thoughts"""
+    async def enhance_recipe_with_nutrition_async(self, ingredients: List[Dict]) -> Dict:
+        """Async enhance_recipe_with_nutrition on the SDK's aio client"""
         try:
-            # Remove markdown code blocks if present
-            cleaned = response_text.strip()
-            if cleaned.startswith("```json"):
-                cleaned = cleaned[7:]
-            elif cleaned.startswith("```"):
-                cleaned = cleaned[3:]
+            response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=self._nutrition_prompt(ingredients),
+                config=self._nutrition_config()
+            )
 
-            if cleaned.endswith("```"):
-                cleaned = cleaned[:-3]
+            nutrition_data = self._parse_json_response(response.text)
 
-            cleaned = cleaned.strip()
+            return nutrition_data
 
-            # Parse JSON
-            data = json.loads(cleaned)
-            return data
+        except Exception as e:
+            print(f"Failed to enhance nutrition data with Gemini 3: {str(e)}")
+            return dict(EMPTY_NUTRITION)
+
+    def _video_cache_key(self, video_path: str) -> Optional[str]:
+        if _analysis_cache is None:
+            return None
+        return (f"{fingerprint_file(video_path)}:{self.model_name}:{VIDEO_PROMPT_VERSION}:"
+                f"{self.transcoder.profile}:{self.tier}")
+
+    def _stream_cache_key(self, streamed: StreamedVideo) -> Optional[str]:
+        if _analysis_cache is None:
+            return None
+        # The buffer is uploaded untranscoded (matches file downloads when transcoding is off)
+        return f"{streamed.sha256}:{self.model_name}:{VIDEO_PROMPT_VERSION}:original:{self.tier}"
+
+    def _cleanup_transcoded(self, video_path: str, upload_path: str):
+        if upload_path != video_path:
+            try:
+                os.remove(upload_path)
+            except OSError as e:
+                print(f"Warning: Failed to remove transcoded video {upload_path}: {str(e)}")
+
+    def _ensure_active(self, video_file):
+        if video_file.state.name != "ACTIVE":
+            raise Exception(f"Video file did not become ACTIVE within {FILE_ACTIVE_DEADLINE:g} seconds. Current state: {video_file.state.name}")
+        print(f"File is now ACTIVE. Proceeding with analysis...")
+
+    def _record_processing(self, video_file, size_bytes: Optional[int], upload_seconds: float,
+                           processing_started: float, polls: int):
+        file_processing_metrics.record(
+            video_file.name,
+            size_bytes,
+            upload_seconds,
+            time.monotonic() - processing_started,
+            polls,
+            video_file.state.name == "ACTIVE"
+        )
+
+    async def _delete_file_quietly(self, file_name: str):
+        """Best-effort cleanup of an uploaded file; shielded so it survives cancellation"""
+        try:
+            await asyncio.shield(self.client.aio.files.delete(name=file_name))
+        except BaseException as e:
+            print(f"Warning: Failed to delete uploaded file {file_name}: {str(e)}")
+
+    def _generate_tiered(
+        self,
+        contents: List,
+        make_config: Callable[[GenerationTier], types.GenerateContentConfig],
+        report_stage: Callable[[str], None] = lambda stage: None
+    ) -> Dict:
+        """
+        Generate and parse at each tier in self.tiers until the result passes
+        validate_recipe. Unparseable or invalid output moves up a tier; on the
+        last tier it raises instead.
+        """
+        for position, tier in enumerate(self.tiers):
+            if position:
+                report_stage(f"generating ({tier.name})")
+            response = self.client.models.generate_content(
+                model=self.model_name,
+                contents=contents,
+                config=make_config(tier)
+            )
+            recipe_data = self._accept_tier_result(response.text, position)
+            if recipe_data is not None:
+                return recipe_data
+
+    async def _generate_tiered_async(
+        self,
+        contents: List,
+        make_config: Callable[[GenerationTier], types.GenerateContentConfig],
+        report_stage: Callable[[str], None] = lambda stage: None
+    ) -> Dict:
+        """Async _generate_tiered on the SDK's aio client"""
+        for position, tier in enumerate(self.tiers):
+            if position:
+                report_stage(f"generating ({tier.name})")
+            if self.on_partial is not None:
+                response_text = await self._generate_streamed_async(contents, make_config(tier))
+            else:
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=contents,
+                    config=make_config(tier)
+                )
+                response_text = response.text
+            recipe_data = self._accept_tier_result(response_text, position)
+            if recipe_data is not None:
+                return recipe_data
+
+    async def _generate_streamed_async(self, contents: List, config: types.GenerateContentConfig) -> str:
+        """generate_content_stream, passing completed recipe fields to on_partial; returns the full text"""
+        self.on_partial(None)
+        emitter = PartialRecipeEmitter(self.on_partial)
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model_name,
+            contents=contents,
+            config=config
+        )
+        async for chunk in stream:
+            if chunk.text:
+                emitter.feed(chunk.text)
+        return emitter.text
+
+    def _accept_tier_result(self, response_text: Optional[str], position: int) -> Optional[Dict]:
+        """Parsed result of the tier at `position`, or None to escalate to the next tier"""
+        tier = self.tiers[position]
+        last = position == len(self.tiers) - 1
+        try:
+            recipe_data = self._parse_json_response(response_text or "")
+        except Exception as e:
+            if last:
+                raise
+            print(f"{tier.name} tier output unusable ({str(e)}); escalating to {self.tiers[position + 1].name}")
+            return None
+
+        drop_incomplete_items(recipe_data)
+        problems = validate_recipe(recipe_data)
+        if problems and last:
+            raise Exception(f"Extracted recipe failed validation: {', '.join(problems)}")
+        if problems:
+            print(f"{tier.name} tier result failed validation ({', '.join(problems)}); "
+                  f"escalating to {self.tiers[position + 1].name}")
+            return None
+        return recipe_data
+
+    def _video_config(self, tier: GenerationTier) -> types.GenerateContentConfig:
+        # Gemini 3 configuration; the tier sets thinking level, budget and resolution
+        return types.GenerateContentConfig(
+            temperature=tier.temperature,
+            top_p=0.95,
+            max_output_tokens=tier.max_output_tokens,
+            thinking_config=types.ThinkingConfig(
+                thinking_level=tier.thinking_level
+            ),
+            media_resolution=tier.media_resolution,
+            **self._json_output(RecipeExtraction)
+        )
+
+    def _frames_config(self, tier: GenerationTier) -> types.GenerateContentConfig:
+        # FRAMES_MEDIA_RESOLUTION, when set, overrides the tier (HIGH keeps on-screen text legible)
+        return types.GenerateContentConfig(
+            temperature=tier.temperature,
+            top_p=0.95,
+            max_output_tokens=tier.max_output_tokens,
+            thinking_config=types.ThinkingConfig(
+                thinking_level=tier.thinking_level
+            ),
+            media_resolution=FRAMES_MEDIA_RESOLUTION or tier.media_resolution,
+            **self._json_output(ScoredRecipeExtraction)
+        )
+
+    def _nutrition_config(self) -> types.GenerateContentConfig:
+        # Nutrition is a single call at the requested tier's thinking level ('auto' starts at fast)
+        return types.GenerateContentConfig(
+            temperature=0.5,  # Lower temperature for more precise calculations
+            top_p=0.9,
+            max_output_tokens=2048,
+            thinking_config=types.ThinkingConfig(
+                thinking_level=self.tiers[0].thinking_level
+            ),
+            **self._json_output(NutritionInfoBase)
+        )
+
+    def _json_output(self, schema) -> Dict:
+        """Structured-output settings for a GenerateContentConfig (unless GEMINI_STRUCTURED_OUTPUT=false)"""
+        if not STRUCTURED_OUTPUT:
+            return {}
+        return {"response_mime_type": "application/json", "response_schema": schema}
+
+    def _frame_parts(self, frames: List) -> List[types.Part]:
+        """
+        Convert BGR frames to inline JPEG image parts (batch-encoded within the size budget).
+        Frames from FrameSampler are each preceded by their timestamp.
+        """
+        timestamps = getattr(frames, "timestamps", None)
+        image_parts = []
+        for index, data in enumerate(encode_frames_jpeg(frames)):
+            if timestamps:
+                image_parts.append(types.Part.from_text(text=f"Frame at {timestamps[index]:.1f}s:"))
+            image_parts.append(types.Part.from_bytes(data=data, mime_type='image/jpeg'))
+        return image_parts
+
+    def _nutrition_prompt(self, ingredients: List[Dict]) -> str:
+        ingredients_text = "\n".join([
+            f"- {ing['quantity']} {ing.get('unit', '')} {ing['name']}"
+            for ing in ingredients
+        ])
+        return NUTRITION_PROMPT.format(ingredients_text=ingredients_text)
 
-        except json.JSONDecodeError as e:
+    def _parse_json_response(self, response_text: str) -> Dict:
+        """
+        Parse JSON from a Gemini response. Fenced, truncated or trailing-comma
+        output is repaired (json_repair) rather than failing the extraction.
+        """
+        try:
+            return parse_json_lenient(response_text)
+        except ValueError as e:
             print(f"Failed to parse JSON response: {response_text}")
             raise Exception(f"Invalid JSON response from Gemini: {str(e)}")
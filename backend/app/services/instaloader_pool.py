@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+import instaloader
+from instaloader.exceptions import ConnectionException, TooManyRequestsException
+
+
+class _Session:
+    def __init__(self, loader: instaloader.Instaloader):
+        self.loader = loader
+        self.available_at = 0.0
+        self.in_use = False
+
+
+class InstaloaderPool:
+    """
+    Warm Instaloader sessions shared by Instagram downloads.
+    Reusing a session keeps its cookies and Instaloader's own request-rate
+    bookkeeping across jobs, instead of paying anonymous context setup on every call.
+    A session that gets rate limited is benched for cooldown_seconds, and
+    acquire() hands out the session that becomes free soonest.
+    If a session file is configured (instaloader --login), every session loads it.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        session_username: Optional[str] = None,
+        session_file: Optional[str] = None,
+        cooldown_seconds: float = 300
+    ):
+        self.session_username = session_username
+        self.session_file = session_file
+        self.cooldown_seconds = cooldown_seconds
+        self._sessions: List[_Session] = [_Session(self._build_loader()) for _ in range(max(1, size))]
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls) -> "InstaloaderPool":
+        return cls(
+            size=int(os.getenv("INSTAGRAM_SESSIONS", "2")),
+            session_username=os.getenv("INSTAGRAM_SESSION_USERNAME") or None,
+            session_file=os.getenv("INSTAGRAM_SESSION_FILE") or None,
+            cooldown_seconds=float(os.getenv("INSTAGRAM_COOLDOWN_SECONDS", "300"))
+        )
+
+    def _build_loader(self) -> instaloader.Instaloader:
+        loader = instaloader.Instaloader(
+            download_videos=True,
+            download_video_thumbnails=False,
+            download_geotags=False,
+            download_comments=False,
+            save_metadata=False,
+            compress_json=False,
+            quiet=True
+        )
+        if self.session_username:
+            try:
+                loader.load_session_from_file(self.session_username, self.session_file)
+            except Exception as e:
+                print(f"Warning: Could not load Instagram session for {self.session_username}: {str(e)}")
+        return loader
+
+    @contextmanager
+    def acquire(self):
+        """Borrow a session, waiting for one to be free and out of cooldown"""
+        session = self._checkout()
+        try:
+            yield session.loader
+        except (TooManyRequestsException, ConnectionException) as e:
+            if isinstance(e, TooManyRequestsException) or "429" in str(e):
+                session.available_at = time.monotonic() + self.cooldown_seconds
+                print(f"Instagram session rate limited; cooling down for {self.cooldown_seconds:g}s")
+            raise
+        finally:
+            with self._condition:
+                session.in_use = False
+                self._condition.notify_all()
+
+    def _checkout(self) -> _Session:
+        with self._condition:
+            while True:
+                idle = [s for s in self._sessions if not s.in_use]
+                if idle:
+                    session = min(idle, key=lambda s: s.available_at)
+                    wait = session.available_at - time.monotonic()
+                    if wait <= 0:
+                        session.in_use = True
+                        return session
+                    # Every idle session is cooling down; a release may also wake us
+                    self._condition.wait(timeout=wait)
+                else:
+                    self._condition.wait()
+
+
+_pool: Optional[InstaloaderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_instaloader_pool() -> InstaloaderPool:
+    """Shared pool, configured from INSTAGRAM_* settings on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = InstaloaderPool.from_env()
+    return _pool
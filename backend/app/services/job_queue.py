@@ -0,0 +1,269 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from .. import schemas
+
+
+class ExtractionJob:
+    """
+    Tracks a single recipe extraction while it moves through the pipeline.
+    Progress is also kept as an event log (stage changes, partial recipe fields
+    while Gemini generates, then completed/failed) that stream_events replays
+    and follows.
+    """
+
+    def __init__(
+        self,
+        video_url: str,
+        model_name: str,
+        canonical_id: str = None,
+        mode: str = "video",
+        tier: str = "auto"
+    ):
+        self.id = uuid.uuid4().hex
+        self.video_url = video_url
+        self.model_name = model_name
+        self.mode = mode  # 'video', 'frames' or 'transcript' (see schemas.ExtractionMode)
+        self.tier = tier  # 'fast', 'standard', 'deep' or 'auto' (see schemas.ExtractionTier)
+        self.canonical_id = canonical_id
+        # Identity used to coalesce duplicate submissions of the same video
+        self.key = canonical_id or video_url
+        self.status = "queued"  # queued, running, completed, failed
+        self.stage = "queued"  # queued, downloading, uploading, processing, generating, saving, done
+        self.message: Optional[str] = None
+        self.error: Optional[str] = None
+        self.recipe_id: Optional[int] = None
+        # Response model built when the pipeline saved the recipe (None for existing recipes)
+        self.recipe: Optional[schemas.Recipe] = None
+        self.created_at = datetime.utcnow()
+        self.updated_at = self.created_at
+        self._done = asyncio.Event()
+        self.events: List[Dict] = []
+        # Only jobs someone follows via /extract/stream generate with partial-field events
+        self.stream_partials = False
+        # Replaced on every publish; followers wait on the one current when they last caught up
+        self._changed = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def set_stage(self, stage: str):
+        """Record progress. Safe to call from worker threads (plain attribute writes)."""
+        self.status = "running"
+        changed = stage != self.stage
+        self.stage = stage
+        self.updated_at = datetime.utcnow()
+        if changed:
+            self._publish({"type": "stage", "stage": stage})
+
+    def publish_partial(self, update: Optional[Dict]):
+        """
+        Record a recipe field recognized in the streamed Gemini response
+        ({"field", "value"} plus "index" for list items), or None when a new
+        generation attempt starts and earlier partial fields should be discarded.
+        Safe to call from worker threads.
+        """
+        self._publish({"type": "partial_reset"} if update is None else {"type": "partial", **update})
+
+    def complete(
+        self,
+        recipe_id: int,
+        message: str = "Recipe extracted successfully",
+        recipe: Optional[schemas.Recipe] = None
+    ):
+        """Mark the job completed (call from the event loop)"""
+        self.status = "completed"
+        self.stage = "done"
+        self.recipe_id = recipe_id
+        self.recipe = recipe
+        self.message = message
+        self.updated_at = datetime.utcnow()
+        self._done.set()
+        self._publish({"type": "completed", "recipe_id": recipe_id, "message": message})
+
+    def fail(self, error: str):
+        """Mark the job failed (call from the event loop)"""
+        self.status = "failed"
+        self.error = error
+        self.message = "Recipe extraction failed"
+        self.updated_at = datetime.utcnow()
+        self._done.set()
+        self._publish({"type": "failed", "error": error})
+
+    async def wait(self) -> "ExtractionJob":
+        """Wait until the job is completed or failed"""
+        await self._done.wait()
+        return self
+
+    async def stream_events(self) -> AsyncIterator[Dict]:
+        """Yield every event so far, then new ones as they happen, until the job finishes"""
+        self._loop = asyncio.get_running_loop()
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.events):
+                yield self.events[sent]
+                sent += 1
+            if self.finished and sent == len(self.events):
+                return
+            await changed.wait()
+
+    def _publish(self, event: Dict):
+        # list.append is atomic, so worker threads can publish; waking followers
+        # has to happen on the event loop they wait on
+        self.events.append(event)
+        if self._loop is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._wake()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "video_url": self.video_url,
+            "model": self.model_name,
+            "mode": self.mode,
+            "tier": self.tier,
+            "message": self.message,
+            "error": self.error,
+            "recipe_id": self.recipe_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobQueue:
+    """
+    In-process extraction queue drained by a pool of asyncio workers.
+    Blocking work (downloads, Gemini calls, database writes) is pushed to threads
+    by the handler, so the event loop stays free to serve other requests.
+
+    Submissions are single-flight per video: while a job for a key is queued or
+    running, further submissions for that key attach to it instead of starting
+    another download and Gemini call.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[ExtractionJob], Awaitable[None]],
+        num_workers: int = None,
+        retention_seconds: int = None
+    ):
+        self.handler = handler
+        self.num_workers = num_workers or int(os.getenv("EXTRACTION_WORKERS", "4"))
+        self.retention = timedelta(
+            seconds=retention_seconds or int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+        )
+        self.jobs: Dict[str, ExtractionJob] = {}
+        self._inflight: Dict[str, ExtractionJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """Spawn the worker pool on the running event loop"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.num_workers)
+        ]
+        print(f"Started {self.num_workers} extraction workers")
+
+    async def stop(self):
+        """Cancel all workers (in-flight jobs are abandoned)"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(
+        self,
+        video_url: str,
+        model_name: str,
+        canonical_id: str = None,
+        mode: str = "video",
+        tier: str = "auto",
+        stream_partials: bool = False
+    ) -> ExtractionJob:
+        """
+        Enqueue an extraction and return its job immediately.
+        If the same video (canonical id, falling back to the URL) is already in
+        flight, the existing job is returned so all callers share one result.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue has not been started")
+
+        inflight = self.find_inflight(canonical_id or video_url)
+        if inflight:
+            # Takes effect from the next generation attempt if one is already running
+            inflight.stream_partials = inflight.stream_partials or stream_partials
+            return inflight
+
+        self._prune()
+        job = ExtractionJob(video_url, model_name, canonical_id=canonical_id, mode=mode, tier=tier)
+        job.stream_partials = stream_partials
+        self.jobs[job.id] = job
+        self._inflight[job.key] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def find_inflight(self, key: str) -> Optional[ExtractionJob]:
+        """Return the queued or running job for a video key, if any"""
+        job = self._inflight.get(key)
+        return job if job and not job.finished else None
+
+    def register(self, job: ExtractionJob) -> ExtractionJob:
+        """Track a job that was resolved without running the pipeline"""
+        self._prune()
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[ExtractionJob]:
+        return self.jobs.get(job_id)
+
+    def pending_count(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window"""
+        cutoff = datetime.utcnow() - self.retention
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished and job.updated_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                job.set_stage("starting")
+                await self.handler(job)
+            except asyncio.CancelledError:
+                job.fail("Extraction was cancelled")
+                raise
+            except Exception as e:
+                print(f"Worker {worker_id}: job {job.id} failed: {str(e)}")
+                job.fail(str(e))
+            finally:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+                self._queue.task_done()
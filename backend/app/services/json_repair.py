@@ -0,0 +1,202 @@
+"""
+Lenient JSON parsing for model output.
+Schema-constrained responses are normally valid JSON, but a response cut off at
+max_output_tokens, a trailing comma or prose around the object would otherwise
+throw away a whole (expensive) extraction. The repair keeps everything that was
+complete: unterminated strings and containers are closed, and a dangling key or
+partial value is dropped back to the last point where the document was whole.
+StreamedObjectScanner reports the members of an object as they complete while
+the response is still streaming.
+"""
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+# How many earlier cut points to try on a truncated document before giving up
+MAX_REPAIR_ATTEMPTS = 64
+
+
+def parse_json_lenient(text: str) -> Any:
+    """
+    json.loads, falling back to repair_json. Raises ValueError when the text
+    holds no recoverable JSON object or array.
+    """
+    cleaned = _FENCE.sub("", (text or "").strip())
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        error = e
+
+    for candidate in repair_json(cleaned):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError(f"Unrecoverable JSON: {error}")
+
+
+def repair_json(text: str) -> List[str]:
+    """
+    Candidate repairs of `text`, best first: the first complete top-level
+    object/array with trailing commas removed, or - if the document was cut
+    off - the text closed at the end, then closed at each earlier comma or
+    opening list bracket.
+    """
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        return []
+
+    out, stack, in_string, cuts, complete = _scan(text[start:])
+    if complete:
+        return ["".join(out)]
+
+    tail = "".join(out) + ('"' if in_string else "")
+    candidates = [tail.rstrip().rstrip(",") + _closers(stack)]
+    for position, open_stack in reversed(cuts[-MAX_REPAIR_ATTEMPTS:]):
+        candidates.append("".join(out[:position]).rstrip().rstrip(",") + _closers(open_stack))
+    return candidates
+
+
+class StreamedObjectScanner:
+    """
+    Incremental scanner for a top-level JSON object that is still streaming in.
+    feed() looks only at the new text and returns the values it completed, each
+    parsed once: (key, None, value) for a top-level member and (key, index, item)
+    for each item of a top-level list, so long lists are reported item by item.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._position = 0
+        self._stack: List[str] = []
+        self._in_string = self._escape = self._done = False
+        self._member_start = 0  # where the current top-level "key": value begins
+        self._key: Optional[str] = None
+        self._value_start = 0
+        self._item_start = 0
+        self._item_index = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Optional[int], Any]]:
+        self.text += chunk
+        completed = []
+        text = self.text
+        for position in range(self._position, len(text)):
+            if self._done:
+                break
+            ch = text[position]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            depth = len(self._stack)
+            if ch == '"':
+                if depth:
+                    self._in_string = True
+            elif ch in "{[":
+                if depth == 0 and ch == "[":
+                    continue  # only a top-level object is followed
+                self._stack.append("}" if ch == "{" else "]")
+                if depth == 0:
+                    self._member_start = position + 1
+                elif depth == 1 and ch == "[":
+                    self._item_start = position + 1
+                    self._item_index = 0
+            elif ch == ":" and depth == 1:
+                self._key = _loads(text[self._member_start:position])
+                self._value_start = position + 1
+            elif ch == "," or ch in "}]":
+                # A comma separates list items and a closing bracket ends the last one
+                if depth == 2 and self._stack[-1] == "]":
+                    self._end_item(position, completed)
+                if ch == ",":
+                    if depth == 1:
+                        self._end_member(position, completed)
+                        self._member_start = position + 1
+                elif depth:
+                    self._stack.pop()
+                    if depth == 1:
+                        self._end_member(position, completed)
+                        self._done = True
+        self._position = len(text)
+        return completed
+
+    def _end_member(self, position: int, completed: list):
+        if isinstance(self._key, str) and self.text[self._value_start:position].strip():
+            completed.append((self._key, None, _loads(self.text[self._value_start:position])))
+        self._key = None
+
+    def _end_item(self, position: int, completed: list):
+        item = self.text[self._item_start:position]
+        self._item_start = position + 1
+        if item.strip() and isinstance(self._key, str):
+            completed.append((self._key, self._item_index, _loads(item)))
+            self._item_index += 1
+
+
+def _loads(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            return parse_json_lenient(text)
+        except ValueError:
+            return None
+
+
+def _scan(text: str) -> Tuple[List[str], List[str], bool, List[Tuple[int, Tuple[str, ...]]], bool]:
+    """
+    Copy `text` up to the end of its first top-level container, dropping commas
+    that directly precede a closing bracket. Returns (chars, open containers,
+    inside a string, cut points, complete); a cut point is an output length at
+    which the document can be closed, with the containers open there.
+    """
+    out = []
+    stack = []
+    cuts = []
+    in_string = escape = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+            # An empty list is a usable partial value; an empty nested object
+            # (e.g. an ingredient without a name) is not
+            if ch == "[" or len(stack) == 1:
+                cuts.append((len(out), tuple(stack)))
+        elif ch in "}]":
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                return out, stack, False, cuts, True
+        elif ch == ",":
+            cuts.append((len(out), tuple(stack)))
+            out.append(ch)
+        else:
+            out.append(ch)
+    return out, stack, in_string, cuts, False
+
+
+def _closers(stack) -> str:
+    return "".join(reversed(stack))
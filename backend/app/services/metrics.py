@@ -0,0 +1,64 @@
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+class FileProcessingMetrics:
+    """
+    Rolling record of how long uploaded videos take to become ACTIVE in Gemini,
+    used to tune the polling schedule against real video lengths.
+    """
+
+    def __init__(self, max_samples: int = 500):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, file_name: str, size_bytes: Optional[int], upload_seconds: float,
+               processing_seconds: float, polls: int, became_active: bool):
+        sample = {
+            "file_name": file_name,
+            "size_bytes": size_bytes,
+            "upload_seconds": round(upload_seconds, 3),
+            "processing_seconds": round(processing_seconds, 3),
+            "polls": polls,
+            "became_active": became_active,
+            "recorded_at": datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            self._samples.append(sample)
+        print(f"Gemini file {file_name}: upload {upload_seconds:.2f}s, "
+              f"processing {processing_seconds:.2f}s over {polls} status checks")
+
+    def summary(self) -> Dict:
+        with self._lock:
+            samples = list(self._samples)
+
+        processing = sorted(s["processing_seconds"] for s in samples if s["became_active"])
+        uploads = sorted(s["upload_seconds"] for s in samples)
+        return {
+            "samples": len(samples),
+            "timeouts": sum(1 for s in samples if not s["became_active"]),
+            "processing_seconds": {
+                "p50": _percentile(processing, 0.5),
+                "p90": _percentile(processing, 0.9),
+                "p99": _percentile(processing, 0.99),
+                "max": processing[-1] if processing else None,
+            },
+            "upload_seconds": {
+                "p50": _percentile(uploads, 0.5),
+                "p90": _percentile(uploads, 0.9),
+            },
+            "avg_polls": round(sum(s["polls"] for s in samples) / len(samples), 2) if samples else None,
+            "recent": samples[-20:],
+        }
+
+
+file_processing_metrics = FileProcessingMetrics()
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+
+class Throttle:
+    """
+    Async concurrency + rate budget for an expensive pipeline stage.
+    Use as `async with throttle:`; at most max_concurrent holders run at once and,
+    if per_minute is set, holders start no closer together than 60/per_minute seconds.
+    """
+
+    def __init__(self, max_concurrent: int, per_minute: float = 0):
+        self.max_concurrent = max_concurrent
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._rate_lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        if self.interval:
+            try:
+                async with self._rate_lock:
+                    delay = self._next_start - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    self._next_start = time.monotonic() + self.interval
+            except BaseException:
+                self._semaphore.release()
+                raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
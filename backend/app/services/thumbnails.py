@@ -0,0 +1,90 @@
+"""
+Thumbnail selection and resizing.
+A representative frame is chosen by scoring a handful of sampled frames on
+sharpness and exposure, since the first frame of a short video is often a
+black or motion-blurred transition.
+"""
+from pathlib import Path
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from .frame_sampler import FrameSampler
+
+# Widths of the generated variants; "full" keeps the source size
+THUMBNAIL_WIDTHS = {"160": 160, "480": 480, "full": None}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# Only part of the timeline is sampled: intros/outros tend to be titles or fades
+SAMPLE_START = 0.05
+SAMPLE_END = 0.6
+
+
+def score_frame(frame: np.ndarray) -> float:
+    """
+    Higher is better: variance of the Laplacian (sharpness), scaled down for
+    frames that are too dark or blown out.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    # Score on a small copy; sharpness ranking is stable under downscaling
+    height, width = gray.shape
+    if width > 320:
+        gray = cv2.resize(gray, (320, max(1, int(height * 320 / width))), interpolation=cv2.INTER_AREA)
+
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    brightness = float(gray.mean())
+    # 1.0 across mid-tones, falling to 0 at pure black / pure white
+    exposure = max(0.0, 1.0 - abs(brightness - 128.0) / 128.0) ** 0.5
+    return sharpness * exposure
+
+
+def pick_representative_frame(video_path: str, samples: int = 8) -> Optional[np.ndarray]:
+    """
+    Best-scoring of about `samples` frames from the sampled part of the video.
+    Candidates are scored on small copies from one sequential pass; only the
+    winner is then decoded again at full resolution.
+    """
+    # Uniform over the whole video, since the real length is only known after decoding
+    candidates = FrameSampler(max_width=320).sample(video_path, num_frames=samples * 2)
+    if not len(candidates):
+        return None
+
+    duration = candidates.timestamps[-1] or 1.0
+    window = [
+        i for i, timestamp in enumerate(candidates.timestamps)
+        if SAMPLE_START <= timestamp / duration <= SAMPLE_END
+    ] or list(range(len(candidates)))
+    best = max(window, key=lambda i: score_frame(candidates[i]))
+
+    full = FrameSampler(max_width=None).sample(
+        video_path, mode="timestamps", timestamps=[candidates.timestamps[best]]
+    )
+    return full[0] if len(full) else None
+
+
+def write_variants(image: np.ndarray, directory: Path, stem: str) -> Dict[str, Dict[str, Path]]:
+    """
+    Write each THUMBNAIL_WIDTHS size as WebP and JPEG (never upscaled).
+    Returns {size: {"webp": path, "jpg": path}}.
+    """
+    height, width = image.shape[:2]
+    variants = {}
+    for size, target_width in THUMBNAIL_WIDTHS.items():
+        resized = image
+        if target_width and width > target_width:
+            resized = cv2.resize(
+                image, (target_width, max(1, int(height * target_width / width))),
+                interpolation=cv2.INTER_AREA
+            )
+
+        webp_path = directory / f"{stem}_{size}.webp"
+        jpg_path = directory / f"{stem}_{size}.jpg"
+        cv2.imwrite(str(webp_path), resized, [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY])
+        cv2.imwrite(
+            str(jpg_path), resized,
+            [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY, cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+        )
+        variants[size] = {"webp": webp_path, "jpg": jpg_path}
+    return variants
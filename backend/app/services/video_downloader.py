@@ -1,10 +1,74 @@
 import yt_dlp
 import instaloader
+import hashlib
+import io
 import os
 import re
-from typing import Tuple, Optional
+import requests
+import shutil
+import tempfile
+from typing import Dict, List, Tuple, Optional
 import cv2
+import numpy as np
 from pathlib import Path
+from PIL import Image
+from yt_dlp.networking import Request
+
+from .cache import JsonFileCache
+from .frame_sampler import FrameSampler, SampledFrames
+from .instaloader_pool import get_instaloader_pool
+from .thumbnails import pick_representative_frame, write_variants
+
+
+def subtitles_to_text(subtitles: str) -> str:
+    """WebVTT/SRT cues as plain text: no header, cue numbers, timings, tags or repeated lines"""
+    lines = []
+    for line in subtitles.splitlines():
+        line = line.strip()
+        if not line or line.isdigit() or '-->' in line:
+            continue
+        if line.startswith(('WEBVTT', 'NOTE', 'STYLE', 'Kind:', 'Language:')):
+            continue
+        line = re.sub(r'<[^>]+>', '', line).strip()
+        # Rolling auto-captions repeat the previous line
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+class StreamedVideo:
+    """
+    A video downloaded into a SpooledTemporaryFile instead of data/videos.
+    Stays in memory up to the spill threshold, then rolls over to an anonymous
+    local temp file. The SHA-256 is computed while streaming, so the content
+    never has to be re-read to fingerprint it.
+    """
+
+    def __init__(self, platform: str, video_id: str, spill_bytes: int, mime_type: str = "video/mp4"):
+        self.platform = platform
+        self.video_id = video_id
+        self.mime_type = mime_type
+        self.spill_bytes = spill_bytes
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=spill_bytes, mode="w+b")
+        self.size_bytes = 0
+        self.thumbnail_path: Optional[str] = None
+        self._digest = hashlib.sha256()
+
+    def write(self, chunk: bytes):
+        self.buffer.write(chunk)
+        self._digest.update(chunk)
+        self.size_bytes += len(chunk)
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    @property
+    def spilled(self) -> bool:
+        return self.size_bytes > self.spill_bytes
+
+    def close(self):
+        self.buffer.close()
 
 
 class VideoDownloader:
@@ -13,8 +77,38 @@ class VideoDownloader:
         self.data_dir = base_dir / "data"
         self.download_path = Path(download_path) if download_path else self.data_dir / "videos"
         self.images_path = Path(images_path) if images_path else self.data_dir / "images"
+        # In-progress downloads; outside data/videos, which is served publicly at /videos
+        self.temp_path = self.data_dir / "tmp"
         self.download_path.mkdir(parents=True, exist_ok=True)
         self.images_path.mkdir(parents=True, exist_ok=True)
+        self.temp_path.mkdir(parents=True, exist_ok=True)
+
+        # Which yt-dlp rendition to fetch:
+        #   smallest - smallest combined audio+video stream at least DOWNLOAD_MIN_HEIGHT tall
+        #   capped   - best combined stream within the bitrate cap
+        #   best     - yt-dlp's 'best' (previous behaviour)
+        # Every policy rejects videos estimated above DOWNLOAD_MAX_FILESIZE_MB before downloading.
+        self.format_policy = os.getenv("DOWNLOAD_FORMAT_POLICY", "smallest").lower()
+        self.min_height = int(os.getenv("DOWNLOAD_MIN_HEIGHT", "480"))
+        self.max_bitrate_kbps = float(os.getenv("DOWNLOAD_MAX_BITRATE_KBPS", "2500"))
+        self.max_filesize = int(float(os.getenv("DOWNLOAD_MAX_FILESIZE_MB", "100")) * 1024 * 1024)
+
+        # Stream media into memory for upload instead of writing it to data/videos
+        # (a network volume on Modal); larger videos spill to a local temp file
+        self.stream_downloads = os.getenv("STREAM_DOWNLOADS", "false").lower() == "true"
+        self.stream_spill_bytes = int(float(os.getenv("STREAM_SPILL_MB", "32")) * 1024 * 1024)
+        self.stream_chunk_bytes = 256 * 1024
+
+        # Platform metadata (yt-dlp info, Instaloader post JSON, short-link redirects)
+        # keyed by canonical video id, so dedup checks, format selection and retries
+        # skip the metadata round trip. TTL stays below TikTok's signed media URL lifetime.
+        self.metadata_cache = None
+        if os.getenv("METADATA_CACHE_ENABLED", "true").lower() == "true":
+            self.metadata_cache = JsonFileCache(
+                self.data_dir / "cache" / "metadata",
+                max_bytes=int(os.getenv("METADATA_CACHE_MAX_MB", "50")) * 1024 * 1024,
+                ttl_seconds=int(os.getenv("METADATA_CACHE_TTL_SECONDS", "3600"))
+            )
 
     def _to_public_path(self, file_path: Optional[Path]) -> Optional[str]:
         """
@@ -86,6 +180,58 @@ class VideoDownloader:
         else:
             raise ValueError("Unsupported platform. Only Instagram and TikTok are supported.")
 
+    def canonicalize_url(self, url: str, resolve: bool = True) -> Tuple[str, Optional[str]]:
+        """
+        Map a video URL to (platform, native_id) so URL variants of the same video match.
+        TikTok short links (vm./vt.tiktok.com, tiktok.com/t/) are resolved by following
+        redirects only - no media is downloaded. native_id is None if it cannot be determined.
+        Raises ValueError for unsupported platforms.
+        """
+        platform = self.detect_platform(url)
+
+        if platform == "instagram":
+            return platform, self._extract_instagram_shortcode(url)
+
+        video_id = self._extract_tiktok_id(url)
+        if not video_id and resolve:
+            resolved_url = self._resolve_short_link(url)
+            if resolved_url:
+                video_id = self._extract_tiktok_id(resolved_url)
+        return platform, video_id
+
+    @staticmethod
+    def canonical_key(platform: str, native_id: Optional[str]) -> Optional[str]:
+        """Storage form of a video identity, e.g. 'tiktok:7301234567890123456'"""
+        return f"{platform}:{native_id}" if native_id else None
+
+    def _extract_tiktok_id(self, url: str) -> Optional[str]:
+        """Extract numeric video id from a full TikTok URL"""
+        patterns = [
+            r'tiktok\.com/@[^/]+/(?:video|photo)/(\d+)',
+            r'tiktok\.com/(?:v|embed|embed/v2)/(\d+)',
+            r'tiktok\.com/.*[?&](?:item_id|share_item_id)=(\d+)',
+        ]
+
+        for pattern in patterns:
+            match = re.search(pattern, url)
+            if match:
+                return match.group(1)
+        return None
+
+    def _resolve_redirects(self, url: str) -> Optional[str]:
+        """Follow a short link's redirects and return the final URL (headers only)"""
+        headers = {"User-Agent": "Mozilla/5.0 (compatible; RecipeExtractor/1.0)"}
+        try:
+            response = requests.head(url, allow_redirects=True, timeout=10, headers=headers)
+            if response.status_code >= 400:
+                # Some short-link hosts reject HEAD; fall back to GET without reading the body
+                response = requests.get(url, allow_redirects=True, timeout=10, headers=headers, stream=True)
+                response.close()
+            return response.url
+        except Exception as e:
+            print(f"Warning: Could not resolve short link {url}: {str(e)}")
+            return None
+
     def download_video(self, url: str) -> Tuple[str, str, Optional[str]]:
         """
         Download video from TikTok or Instagram
@@ -101,20 +247,40 @@ class VideoDownloader:
             raise ValueError(f"Unsupported platform: {platform}")
 
     def _download_tiktok(self, url: str) -> Tuple[str, str, Optional[str]]:
-        """Download TikTok video using yt-dlp"""
+        """
+        Download TikTok video using yt-dlp
+        Metadata is probed first so only the rendition chosen by the format policy
+        is fetched, and oversize videos are rejected before any media is downloaded.
+        """
         ydl_opts = {
             'format': 'best',
-            'outtmpl': str(self.download_path / '%(id)s.%(ext)s'),
+            # Relative template so 'paths' apply: finished files land in data/videos,
+            # .part files stay in data/tmp (out of the publicly served directory)
+            'outtmpl': '%(id)s.%(ext)s',
+            'paths': {'home': str(self.download_path), 'temp': str(self.temp_path)},
             'quiet': True,
             'no_warnings': True,
+            # Backstop for formats whose size isn't known up front
+            'max_filesize': self.max_filesize or None,
         }
 
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
+                def download(info):
+                    format_id = self.select_format(info.get('formats') or [], info.get('duration'))
+                    # YoutubeDL fixes its format selection when it is created, so the
+                    # download runs on its own instance configured with the chosen format.
+                    # It reuses the probed metadata; only the selected stream is requested.
+                    with yt_dlp.YoutubeDL({**ydl_opts, 'format': format_id or 'best'}) as download_ydl:
+                        return download_ydl.process_ie_result(info, download=True)
+
+                info = self._with_metadata(
+                    self._metadata_key(url), lambda: self._probe_tiktok(ydl, url), download
+                )
                 video_id = info['id']
-                ext = info['ext']
-                video_path = self.download_path / f"{video_id}.{ext}"
+                # Exact output file as written by yt-dlp
+                downloads = info.get('requested_downloads') or [{}]
+                video_path = Path(downloads[0].get('filepath') or self.download_path / f"{video_id}.{info['ext']}")
 
                 # Extract thumbnail
                 thumbnail_path = self._extract_thumbnail(str(video_path), video_id)
@@ -125,52 +291,310 @@ class VideoDownloader:
         except Exception as e:
             raise Exception(f"Failed to download TikTok video: {str(e)}")
 
-    def _download_instagram(self, url: str) -> Tuple[str, str, Optional[str]]:
-        """Download Instagram video using instaloader"""
+    def download_video_stream(self, url: str) -> StreamedVideo:
+        """
+        Download video from TikTok or Instagram into a StreamedVideo (nothing written to data/videos).
+        The thumbnail is the platform's cover image rather than a decoded frame.
+        Caller must close() the result.
+        """
+        platform = self.detect_platform(url)
+
+        if platform == "tiktok":
+            return self._stream_tiktok(url)
+        elif platform == "instagram":
+            return self._stream_instagram(url)
+        else:
+            raise ValueError(f"Unsupported platform: {platform}")
+
+    def _stream_tiktok(self, url: str) -> StreamedVideo:
+        ydl_opts = {
+            'format': 'best',
+            'quiet': True,
+            'no_warnings': True,
+        }
+
+        streamed = None
         try:
-            L = instaloader.Instaloader(
-                download_videos=True,
-                download_video_thumbnails=False,
-                download_geotags=False,
-                download_comments=False,
-                save_metadata=False,
-                compress_json=False,
-                dirname_pattern=str(self.download_path)
-            )
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                def fetch(info):
+                    format_id = self.select_format(info.get('formats') or [], info.get('duration'))
+                    fmt = next(
+                        (f for f in info.get('formats') or [] if f.get('format_id') == format_id),
+                        info
+                    )
+                    video = StreamedVideo("tiktok", info['id'], self.stream_spill_bytes)
+                    try:
+                        # Through yt-dlp's opener, so the cookies set during extraction are sent
+                        response = ydl.urlopen(Request(fmt['url'], headers=fmt.get('http_headers') or {}))
+                        try:
+                            self._read_into(iter(lambda: response.read(self.stream_chunk_bytes), b""), video)
+                        finally:
+                            response.close()
+                    except Exception:
+                        video.close()
+                        raise
+                    return video, info
+
+                streamed, info = self._with_metadata(
+                    self._metadata_key(url), lambda: self._probe_tiktok(ydl, url), fetch
+                )
+
+            streamed.thumbnail_path = self._save_cover(info.get('thumbnail'), streamed.video_id)
+            return streamed
+        except Exception as e:
+            if streamed is not None:
+                streamed.close()
+            raise Exception(f"Failed to download TikTok video: {str(e)}")
 
-            # Extract shortcode from URL
+    def _stream_instagram(self, url: str) -> StreamedVideo:
+        streamed = None
+        try:
             shortcode = self._extract_instagram_shortcode(url)
             if not shortcode:
                 raise ValueError("Could not extract Instagram shortcode from URL")
 
-            # Download post
-            post = instaloader.Post.from_shortcode(L.context, shortcode)
+            def fetch(post):
+                video = StreamedVideo("instagram", shortcode, self.stream_spill_bytes)
+                try:
+                    with requests.get(post.video_url, stream=True, timeout=30) as response:
+                        response.raise_for_status()
+                        self._read_into(response.iter_content(self.stream_chunk_bytes), video)
+                except Exception:
+                    video.close()
+                    raise
+                return video, post
+
+            with get_instaloader_pool().acquire() as L:
+                streamed, post = self._with_instagram_post(L, shortcode, fetch)
+
+            streamed.thumbnail_path = self._save_cover(post.url, shortcode)
+            return streamed
+        except Exception as e:
+            if streamed is not None:
+                streamed.close()
+            raise Exception(f"Failed to download Instagram video: {str(e)}")
+
+    def fetch_text_context(self, url: str) -> Dict[str, Optional[str]]:
+        """
+        Text that travels with a post: the poster's caption/description and, for
+        TikTok, subtitles or automatic captions from yt-dlp metadata (read through
+        the metadata cache). Returns {"description": ..., "captions": ...}; parts
+        that can't be fetched are None.
+        """
+        context = {"description": None, "captions": None}
+        try:
+            platform = self.detect_platform(url)
+            if platform == "tiktok":
+                with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+                    info = self._with_metadata(
+                        self._metadata_key(url), lambda: self._probe_tiktok(ydl, url), lambda metadata: metadata
+                    )
+                context["description"] = info.get('description') or info.get('title')
+                context["captions"] = self._fetch_captions(info)
+            elif platform == "instagram":
+                shortcode = self._extract_instagram_shortcode(url)
+                if shortcode:
+                    with get_instaloader_pool().acquire() as L:
+                        context["description"] = self._with_instagram_post(L, shortcode, lambda post: post.caption)
+        except Exception as e:
+            print(f"Warning: Could not fetch text context for {url}: {str(e)}")
+        return context
+
+    def _fetch_captions(self, info: Dict) -> Optional[str]:
+        """Plain text of the first usable subtitle track (uploaded before automatic, English first)"""
+        for tracks in (info.get('subtitles') or {}, info.get('automatic_captions') or {}):
+            languages = sorted(tracks, key=lambda lang: not lang.lower().startswith('en'))
+            for lang in languages:
+                for track in tracks[lang]:
+                    if track.get('ext') in ('vtt', 'srt') and track.get('url'):
+                        try:
+                            response = requests.get(track['url'], timeout=15)
+                            response.raise_for_status()
+                            text = subtitles_to_text(response.text)
+                            if text:
+                                return text
+                        except Exception as e:
+                            print(f"Warning: Could not fetch {lang} captions: {str(e)}")
+        return None
+
+    def _metadata_key(self, url: str) -> str:
+        platform, native_id = self.canonicalize_url(url)
+        return self.canonical_key(platform, native_id) or f"{platform}:url:{url}"
 
-            # Download the video
-            L.download_post(post, target=str(self.download_path))
+    def _with_metadata(self, key: str, load, use):
+        """
+        Call use(metadata) with cached metadata for key, loading and caching it on a miss.
+        If use() fails on cached metadata (e.g. expired media URLs), the entry is
+        refreshed once; ValueErrors (rejections such as oversize videos) are not retried.
+        """
+        if self.metadata_cache is None:
+            return use(load())
 
-            # Find the downloaded video file
-            video_files = list(self.download_path.glob(f"{post.date_utc.strftime('%Y-%m-%d_%H-%M-%S')}_UTC*.mp4"))
+        cached = self.metadata_cache.get(key)
+        if cached is not None:
+            try:
+                return use(cached)
+            except ValueError:
+                raise
+            except Exception as e:
+                print(f"Cached metadata for {key} failed ({str(e)}); refreshing")
+                self.metadata_cache.delete(key)
+
+        metadata = load()
+        self.metadata_cache.set(key, metadata)
+        return use(metadata)
+
+    def _probe_tiktok(self, ydl, url: str) -> Dict:
+        # JSON-safe info dict; yt-dlp can re-process it like a --load-info-json file
+        return ydl.sanitize_info(ydl.extract_info(url, download=False))
+
+    def _with_instagram_post(self, L: instaloader.Instaloader, shortcode: str, use):
+        """Call use(post) with the (cached) post; a stale signed video_url triggers one refresh"""
+        def use_structure(structure):
+            post = instaloader.load_structure(L.context, structure)
+            if not post.is_video:
+                raise ValueError("Instagram post is not a video")
+            return use(post)
+
+        return self._with_metadata(
+            self.canonical_key("instagram", shortcode),
+            lambda: instaloader.get_json_structure(instaloader.Post.from_shortcode(L.context, shortcode)),
+            use_structure
+        )
+
+    def _resolve_short_link(self, url: str) -> Optional[str]:
+        """_resolve_redirects through the metadata cache (failed lookups are not cached)"""
+        key = f"redirect:{url}"
+        cached = self.metadata_cache.get(key) if self.metadata_cache else None
+        if cached is not None:
+            return cached["url"]
+        resolved_url = self._resolve_redirects(url)
+        if resolved_url and self.metadata_cache:
+            self.metadata_cache.set(key, {"url": resolved_url})
+        return resolved_url
+
+    def _read_into(self, chunks, streamed: StreamedVideo):
+        for chunk in chunks:
+            streamed.write(chunk)
+            if self.max_filesize and streamed.size_bytes > self.max_filesize:
+                raise ValueError(f"Video exceeds the {self.max_filesize / 1048576:.0f} MB download limit")
+        streamed.buffer.seek(0)
+        where = "a temp file" if streamed.spilled else "memory"
+        print(f"Streamed {streamed.size_bytes / 1e6:.1f} MB into {where}")
+
+    def _save_cover(self, image_url: Optional[str], video_id: str) -> Optional[str]:
+        """Save the platform's cover image as the thumbnail; returns its public path"""
+        if not image_url:
+            return None
+        try:
+            response = requests.get(image_url, timeout=15)
+            response.raise_for_status()
+            thumbnail_path = self.images_path / f"{video_id}_thumb.jpg"
+            # Covers are often WebP; store JPEG like frame-extracted thumbnails
+            Image.open(io.BytesIO(response.content)).convert("RGB").save(thumbnail_path, "JPEG", quality=90)
+            return self._to_public_path(thumbnail_path)
+        except Exception as e:
+            print(f"Failed to save cover thumbnail: {str(e)}")
+            return None
 
-            if video_files:
-                video_path = video_files[0]
-                # Extract thumbnail
-                thumbnail_path = self._extract_thumbnail(str(video_path), shortcode)
-                # thumbnail_path is already a Path object
-                thumbnail_public = self._to_public_path(thumbnail_path) if thumbnail_path else None
-                return "instagram", self._to_public_path(video_path), thumbnail_public
-            else:
-                raise Exception("Video file not found after download")
+    def select_format(self, formats: List[Dict], duration: Optional[float] = None) -> Optional[str]:
+        """
+        Pick the yt-dlp format_id to download under the configured policy.
+        Returns None to let yt-dlp choose ('best' policy, or no usable format metadata).
+        Raises ValueError if every rendition is estimated above the size cap.
+        """
+        # Combined streams only, so nothing needs merging after download
+        candidates = [
+            f for f in formats
+            if f.get('format_id') and f.get('vcodec') != 'none' and f.get('acodec') != 'none'
+        ]
+        if not candidates:
+            return None
+
+        if self.max_filesize:
+            sized = [(f, self._estimate_size(f, duration)) for f in candidates]
+            if all(size is not None and size > self.max_filesize for _, size in sized):
+                smallest = min(size for _, size in sized)
+                raise ValueError(
+                    f"Video is too large to download (~{smallest / 1048576:.0f} MB, "
+                    f"limit {self.max_filesize / 1048576:.0f} MB)"
+                )
+            candidates = [f for f, size in sized if size is None or size <= self.max_filesize]
+
+        if self.format_policy == "best":
+            return None
+
+        def quality(f):
+            return (f.get('height') or 0, f.get('tbr') or 0)
+
+        if self.format_policy == "capped":
+            within_cap = [
+                f for f in candidates
+                if not self.max_bitrate_kbps or (f.get('tbr') or 0) <= self.max_bitrate_kbps
+            ]
+            return max(within_cap or candidates, key=quality)['format_id']
+
+        # smallest: cheapest stream that is tall enough, else the tallest there is
+        tall_enough = [f for f in candidates if (f.get('height') or 0) >= self.min_height]
+        if not tall_enough:
+            return max(candidates, key=quality)['format_id']
+        return min(
+            tall_enough,
+            key=lambda f: (self._estimate_size(f, duration) or float('inf'),) + quality(f)
+        )['format_id']
+
+    @staticmethod
+    def _estimate_size(fmt: Dict, duration: Optional[float]) -> Optional[float]:
+        """Bytes for a format: reported size, else total bitrate x duration"""
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if size:
+            return float(size)
+        if fmt.get('tbr') and duration:
+            return fmt['tbr'] * 1000 / 8 * duration
+        return None
+
+    def _download_instagram(self, url: str) -> Tuple[str, str, Optional[str]]:
+        """
+        Download Instagram video using a pooled instaloader session
+        The file is written into a per-job directory under data/tmp and only the
+        finished file is moved to videos/<shortcode>.mp4, so partial downloads are
+        never served and the exact path is known (no glob over shared files).
+        """
+        job_dir = None
+        try:
+            # Extract shortcode from URL
+            shortcode = self._extract_instagram_shortcode(url)
+            if not shortcode:
+                raise ValueError("Could not extract Instagram shortcode from URL")
+
+            job_dir = Path(tempfile.mkdtemp(prefix=f"{shortcode}-", dir=self.temp_path))
+            downloaded = job_dir / f"{shortcode}.mp4"
+            with get_instaloader_pool().acquire() as L:
+                self._with_instagram_post(
+                    L, shortcode, lambda post: L.context.get_and_write_raw(post.video_url, str(downloaded))
+                )
+
+            video_path = self.download_path / f"{shortcode}.mp4"
+            os.replace(downloaded, video_path)
+
+            # Extract thumbnail
+            thumbnail_path = self._extract_thumbnail(str(video_path), shortcode)
+            # thumbnail_path is already a Path object
+            thumbnail_public = self._to_public_path(thumbnail_path) if thumbnail_path else None
+            return "instagram", self._to_public_path(video_path), thumbnail_public
 
         except Exception as e:
             raise Exception(f"Failed to download Instagram video: {str(e)}")
+        finally:
+            if job_dir is not None:
+                shutil.rmtree(job_dir, ignore_errors=True)
 
     def _extract_instagram_shortcode(self, url: str) -> Optional[str]:
         """Extract shortcode from Instagram URL"""
         patterns = [
-            r'instagram\.com/p/([^/?#&]+)',
-            r'instagram\.com/reel/([^/?#&]+)',
-            r'instagram\.com/tv/([^/?#&]+)',
+            r'instagram\.com/(?:[^/?#&]+/)?p/([^/?#&]+)',
+            r'instagram\.com/(?:[^/?#&]+/)?reels?/([^/?#&]+)',
+            r'instagram\.com/(?:[^/?#&]+/)?tv/([^/?#&]+)',
             r'instagr\.am/p/([^/?#&]+)',
         ]
 
@@ -186,46 +610,68 @@ class VideoDownloader:
         Returns Path object to be processed by _to_public_path()
         """
         try:
-            vidcap = cv2.VideoCapture(video_path)
-            success, image = vidcap.read()
+            # Sharpest well-exposed of a few sampled frames (the first is often black)
+            image = pick_representative_frame(video_path)
 
-            if success:
+            if image is not None:
                 thumbnail_path = self.images_path / f"{video_id}_thumb.jpg"
-                cv2.imwrite(str(thumbnail_path), image)
-                vidcap.release()
+                cv2.imwrite(str(thumbnail_path), image, [cv2.IMWRITE_JPEG_QUALITY, 90])
                 # Return Path object instead of string for consistent processing
                 return thumbnail_path
 
-            vidcap.release()
             return None
         except Exception as e:
             print(f"Failed to extract thumbnail: {str(e)}")
             return None
 
-    def extract_video_frames(self, video_path: str, num_frames: int = 10) -> list:
-        """Extract multiple frames from video for analysis"""
-        frames = []
+    def create_thumbnail_variants(self, thumbnail_path: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Write 160px, 480px and full-size WebP/JPEG copies of a saved thumbnail.
+        Returns {"160"|"480"|"full": {"webp": public path, "jpg": public path}}, or None.
+        """
+        source = self._images_file(thumbnail_path)
+        if source is None:
+            return None
         try:
-            vidcap = cv2.VideoCapture(video_path)
-            total_frames = int(vidcap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-            if total_frames == 0:
-                return frames
-
-            # Calculate frame indices to extract
-            frame_indices = [int(i * total_frames / num_frames) for i in range(num_frames)]
-
-            for idx in frame_indices:
-                vidcap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-                success, image = vidcap.read()
-                if success:
-                    frames.append(image)
+            image = cv2.imread(str(source))
+            if image is None:
+                return None
+            variants = write_variants(image, self.images_path, source.stem)
+            return {
+                size: {fmt: self._to_public_path(path) for fmt, path in paths.items()}
+                for size, paths in variants.items()
+            }
+        except Exception as e:
+            print(f"Failed to create thumbnail variants: {str(e)}")
+            return None
 
-            vidcap.release()
+    def _images_file(self, public_path: Optional[str]) -> Optional[Path]:
+        """Filesystem path for a public images/... path (or absolute path)"""
+        if not public_path:
+            return None
+        if os.path.isabs(public_path):
+            return Path(public_path)
+        if public_path.startswith("images/"):
+            return self.images_path / public_path.replace("images/", "", 1)
+        return Path(public_path)
+
+    def extract_video_frames(
+        self,
+        video_path: str,
+        num_frames: int = 10,
+        mode: str = "uniform",
+        max_width: Optional[int] = 768
+    ) -> SampledFrames:
+        """
+        Extract multiple frames from video for analysis in one sequential decode
+        (see FrameSampler for the uniform/scene modes). Frames come back as one
+        preallocated (n, h, w, 3) BGR array with per-frame timestamps; empty on failure.
+        """
+        try:
+            return FrameSampler(max_width=max_width).sample(video_path, num_frames=num_frames, mode=mode)
         except Exception as e:
             print(f"Failed to extract frames: {str(e)}")
-
-        return frames
+            return SampledFrames(np.empty((0, 0, 0, 3), dtype=np.uint8), [])
 
     def cleanup_video(self, video_path: str) -> bool:
         """
@@ -260,9 +706,15 @@ class VideoDownloader:
             print(f"Failed to cleanup video {video_path}: {str(e)}")
             return False
 
-    def cleanup_recipe_files(self, video_path: Optional[str], thumbnail_path: Optional[str]) -> dict:
+    def cleanup_recipe_files(
+        self,
+        video_path: Optional[str],
+        thumbnail_path: Optional[str],
+        thumbnails: Optional[Dict[str, Dict[str, str]]] = None
+    ) -> dict:
         """
-        Cleanup both video and thumbnail files (used when deleting a recipe).
+        Cleanup both video and thumbnail files (used when deleting a recipe),
+        including any resized thumbnail variants.
         Returns dict with cleanup status.
         """
         result = {
@@ -294,4 +746,14 @@ class VideoDownloader:
             except Exception as e:
                 print(f"Failed to cleanup thumbnail {thumbnail_path}: {str(e)}")
 
+        # Delete thumbnail variants
+        for paths in (thumbnails or {}).values():
+            for variant_path in paths.values():
+                try:
+                    variant_file = self._images_file(variant_path)
+                    if variant_file and variant_file.is_file():
+                        variant_file.unlink()
+                except Exception as e:
+                    print(f"Failed to cleanup thumbnail variant {variant_path}: {str(e)}")
+
         return result
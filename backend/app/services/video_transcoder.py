@@ -0,0 +1,185 @@
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+import cv2
+
+
+class VideoTranscoder:
+    """
+    Optional downscale/re-encode of a downloaded video before it is uploaded to Gemini.
+    Recipe extraction doesn't need 1080p at 30 fps, and a smaller file uploads faster,
+    becomes ACTIVE sooner and costs fewer tokens.
+
+    Uses ffmpeg when it is on PATH (keeps a compact mono audio track for narration).
+    The OpenCV fallback re-encodes video only, so it drops audio and is opt-in.
+    The transcoded file is only used if it is actually smaller than the original.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_height: int = 480,
+        fps: float = 10,
+        crf: int = 30,
+        audio_bitrate: str = "48k",
+        opencv_fallback: bool = False,
+        timeout_seconds: float = 120
+    ):
+        self.enabled = enabled
+        self.max_height = max_height
+        self.fps = fps
+        self.crf = crf
+        self.audio_bitrate = audio_bitrate
+        self.opencv_fallback = opencv_fallback
+        self.timeout_seconds = timeout_seconds
+        self.ffmpeg_path = shutil.which("ffmpeg")
+
+    @classmethod
+    def from_env(cls) -> "VideoTranscoder":
+        return cls(
+            enabled=os.getenv("TRANSCODE_ENABLED", "true").lower() == "true",
+            max_height=int(os.getenv("TRANSCODE_MAX_HEIGHT", "480")),
+            fps=float(os.getenv("TRANSCODE_FPS", "10")),
+            crf=int(os.getenv("TRANSCODE_CRF", "30")),
+            audio_bitrate=os.getenv("TRANSCODE_AUDIO_BITRATE", "48k"),
+            opencv_fallback=os.getenv("TRANSCODE_OPENCV_FALLBACK", "false").lower() == "true",
+            timeout_seconds=float(os.getenv("TRANSCODE_TIMEOUT_SECONDS", "120"))
+        )
+
+    @property
+    def profile(self) -> str:
+        """Short tag for the output settings, used to key cached analysis results"""
+        if not self.enabled:
+            return "original"
+        return f"{self.max_height}p{self.fps:g}fps-crf{self.crf}"
+
+    def transcode(self, video_path: str) -> Optional[str]:
+        """
+        Write a downscaled copy next to video_path and return its path, or None
+        when transcoding is disabled, unavailable, unnecessary or failed
+        (callers then upload the original). The caller deletes the returned file.
+        """
+        if not self.enabled:
+            return None
+        if not self.ffmpeg_path and not self.opencv_fallback:
+            return None
+
+        source = Path(video_path)
+        short_side, fps = self._probe(video_path)
+        if short_side and short_side <= self.max_height and fps and fps <= self.fps:
+            return None
+
+        output = source.with_name(f"{source.stem}.transcoded.mp4")
+        try:
+            if self.ffmpeg_path:
+                self._transcode_ffmpeg(video_path, str(output))
+            else:
+                self._transcode_opencv(video_path, str(output))
+        except Exception as e:
+            print(f"Warning: Transcoding failed, uploading original video: {str(e)}")
+            output.unlink(missing_ok=True)
+            return None
+
+        original_size = source.stat().st_size
+        transcoded_size = output.stat().st_size if output.exists() else 0
+        if not transcoded_size or transcoded_size >= original_size:
+            output.unlink(missing_ok=True)
+            return None
+
+        print(f"Transcoded {source.name}: {original_size / 1e6:.1f} MB -> {transcoded_size / 1e6:.1f} MB")
+        return str(output)
+
+    def extract_audio(self, video_path: str, bitrate: str = "24k") -> Optional[bytes]:
+        """
+        Narration as a small mono 16 kHz Opus/Ogg clip (audio/ogg), or None if ffmpeg
+        is unavailable, the video has no audio track, or extraction fails.
+        """
+        if not self.ffmpeg_path:
+            return None
+        command = [
+            self.ffmpeg_path, "-v", "error",
+            "-i", video_path,
+            "-vn", "-ac", "1", "-ar", "16000",
+            "-c:a", "libopus", "-b:a", bitrate,
+            "-f", "ogg", "pipe:1"
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=self.timeout_seconds)
+        except subprocess.TimeoutExpired:
+            print(f"Warning: Audio extraction timed out for {video_path}")
+            return None
+        if result.returncode != 0 or not result.stdout:
+            print(f"Warning: Audio extraction failed: {result.stderr.decode(errors='replace').strip()}")
+            return None
+        return result.stdout
+
+    def _probe(self, video_path: str):
+        """(shorter side in pixels, fps): max_height caps the shorter side, so portrait video stays legible"""
+        vidcap = cv2.VideoCapture(video_path)
+        try:
+            if not vidcap.isOpened():
+                return None, None
+            width = int(vidcap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(vidcap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            return min(width, height), vidcap.get(cv2.CAP_PROP_FPS)
+        finally:
+            vidcap.release()
+
+    def _transcode_ffmpeg(self, video_path: str, output_path: str):
+        command = [
+            self.ffmpeg_path, "-y", "-v", "error",
+            "-i", video_path,
+            # Cap the shorter side (portrait 1080x1920 -> 480x854), never upscale;
+            # -2 keeps the other side even for libx264
+            "-vf", (
+                f"scale='if(gt(iw,ih),-2,min({self.max_height},iw))'"
+                f":'if(gt(iw,ih),min({self.max_height},ih),-2)',fps={self.fps:g}"
+            ),
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", str(self.crf),
+            "-c:a", "aac", "-b:a", self.audio_bitrate, "-ac", "1",
+            "-movflags", "+faststart",
+            output_path
+        ]
+        result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout_seconds)
+        if result.returncode != 0:
+            raise Exception(result.stderr.strip() or f"ffmpeg exited with {result.returncode}")
+
+    def _transcode_opencv(self, video_path: str, output_path: str):
+        vidcap = cv2.VideoCapture(video_path)
+        writer = None
+        try:
+            if not vidcap.isOpened():
+                raise Exception(f"Could not open video: {video_path}")
+            source_fps = vidcap.get(cv2.CAP_PROP_FPS) or 30
+            width = int(vidcap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(vidcap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            short_side = min(width, height)
+            scale = min(1.0, self.max_height / short_side) if short_side else 1.0
+            size = (int(width * scale) // 2 * 2, int(height * scale) // 2 * 2)
+            out_fps = min(self.fps, source_fps)
+            step = source_fps / out_fps
+
+            writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), out_fps, size)
+            next_keep = 0.0
+            index = 0
+            # grab() skips decoding for dropped frames; only kept frames are retrieved
+            while vidcap.grab():
+                if index >= next_keep:
+                    ok, frame = vidcap.retrieve()
+                    if not ok:
+                        break
+                    if scale < 1.0:
+                        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                    writer.write(frame)
+                    next_keep += step
+                index += 1
+        finally:
+            vidcap.release()
+            if writer is not None:
+                writer.release()
+
+
+video_transcoder = VideoTranscoder.from_env()
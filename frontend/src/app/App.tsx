@@ -54,6 +54,12 @@ type BackendNutrition = {
   servings?: number | null;
 };
 
+// Resized copies of the thumbnail, keyed by width ("160", "480", "full")
+type ThumbnailVariant = {
+  webp: string;
+  jpg: string;
+};
+
 type BackendRecipe = {
   id: number;
   title?: string | null;
@@ -61,6 +67,7 @@ type BackendRecipe = {
   platform: string;
   description?: string | null;
   thumbnail_path?: string | null;
+  thumbnails?: Record<string, ThumbnailVariant> | null;
   video_path?: string | null;
   created_at: string;
   ingredients?: BackendIngredient[];
@@ -68,22 +75,87 @@ type BackendRecipe = {
   nutrition?: BackendNutrition | null;
 };
 
-type ExtractResponse = {
-  success: boolean;
-  message: string;
+type BackendRecipeSummary = Pick<
+  BackendRecipe,
+  "id" | "title" | "video_url" | "platform" | "thumbnail_path" | "thumbnails" | "created_at"
+>;
+
+type RecipeSummaryPage = {
+  items: BackendRecipeSummary[];
+  next_cursor?: string | null;
+};
+
+type ExtractionJob = {
+  job_id: string;
+  status: "queued" | "running" | "completed" | "failed";
+  stage: string;
+  message?: string | null;
+  error?: string | null;
   recipe?: BackendRecipe | null;
 };
 
+// One line of /recipes/extract/stream
+type ExtractionEvent =
+  | ({ type: "job" } & ExtractionJob)
+  | { type: "stage"; stage: string }
+  | { type: "partial"; field: "title" | "description" | "nutrition"; value: unknown }
+  | { type: "partial"; field: "ingredients" | "steps"; index: number; value: unknown }
+  | { type: "partial_reset" }
+  | { type: "completed"; recipe_id: number; message?: string; recipe?: BackendRecipe | null }
+  | { type: "failed"; error: string };
+
+// Recipe fields received so far while Gemini is still generating
+type PartialRecipe = {
+  title?: string | null;
+  description?: string | null;
+  ingredients: Omit<BackendIngredient, "id">[];
+  steps: Omit<BackendStep, "id">[];
+};
+
+const EMPTY_PARTIAL: PartialRecipe = { ingredients: [], steps: [] };
+
+const applyPartial = (partial: PartialRecipe, event: ExtractionEvent): PartialRecipe => {
+  if (event.type === "partial_reset") return EMPTY_PARTIAL;
+  if (event.type !== "partial") return partial;
+  if (event.field === "ingredients" || event.field === "steps") {
+    const items = [...partial[event.field]];
+    items[event.index] = event.value as never;
+    return { ...partial, [event.field]: items };
+  }
+  if (event.field === "title") return { ...partial, title: event.value as string | null };
+  if (event.field === "description") return { ...partial, description: event.value as string | null };
+  return partial;
+};
+
+async function* readNdjson(response: Response): AsyncGenerator<ExtractionEvent> {
+  const reader = response.body!.pipeThrough(new TextDecoderStream()).getReader();
+  let buffered = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffered += value;
+    const lines = buffered.split("\n");
+    buffered = lines.pop() ?? "";
+    for (const line of lines) {
+      if (line.trim()) yield JSON.parse(line) as ExtractionEvent;
+    }
+  }
+  if (buffered.trim()) yield JSON.parse(buffered) as ExtractionEvent;
+}
+
 export default function App() {
   const [apiKey, setApiKey] = useState("");
   const [selectedModel, setSelectedModel] = useState(GEMINI_MODELS[0]);
   const [url, setUrl] = useState("");
   const [isProcessing, setIsProcessing] = useState(false);
+  const [processingStage, setProcessingStage] = useState<string | null>(null);
+  const [partialRecipe, setPartialRecipe] = useState<PartialRecipe | null>(null);
   const [processedVideos, setProcessedVideos] = useState<ProcessedVideo[]>([]);
   const [selectedVideo, setSelectedVideo] = useState<ProcessedVideo | null>(null);
   const [isDialogOpen, setIsDialogOpen] = useState(false);
   const [isSidebarCollapsed, setIsSidebarCollapsed] = useState(false);
   const [errorMessage, setErrorMessage] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   const assetBaseUrl = useMemo(() => API_BASE_URL.replace(/\/$/, ""), []);
 
@@ -144,9 +216,28 @@ export default function App() {
     return normalized;
   };
 
+  const toThumbnailUrl = (path?: string | null) => {
+    const thumbnailPath = toPublicAssetPath(path);
+    return thumbnailPath ? `${assetBaseUrl}/${thumbnailPath}` : "";
+  };
+
+  // Cards are small, so prefer the 480px WebP over the full-size JPEG
+  const toCardThumbnailUrl = (recipe: BackendRecipeSummary) =>
+    toThumbnailUrl(recipe.thumbnails?.["480"]?.webp ?? recipe.thumbnail_path);
+
+  // Gallery cards only carry summary fields; recipes are loaded when a card is opened
+  const mapSummaryToVideo = (summary: BackendRecipeSummary): ProcessedVideo => ({
+    id: String(summary.id),
+    url: summary.video_url,
+    thumbnail: toCardThumbnailUrl(summary) || "https://via.placeholder.com/640x360?text=No+Image",
+    title: summary.title || "Untitled Recipe",
+    platform: summary.platform,
+    recipes: [],
+    processedAt: new Date(summary.created_at),
+  });
+
   const mapRecipeToVideo = (recipe: BackendRecipe): ProcessedVideo => {
-    const thumbnailPath = toPublicAssetPath(recipe.thumbnail_path);
-    const thumbnailUrl = thumbnailPath ? `${assetBaseUrl}/${thumbnailPath}` : "";
+    const thumbnailUrl = toCardThumbnailUrl(recipe);
 
     const sortedSteps = [...(recipe.steps ?? [])].sort(
       (a, b) => a.step_number - b.step_number
@@ -165,6 +256,7 @@ export default function App() {
       url: recipe.video_url,
       thumbnail: thumbnailUrl || "https://via.placeholder.com/640x360?text=No+Image",
       title: recipe.title || "Untitled Recipe",
+      platform: recipe.platform,
       recipes: [
         {
           name: recipe.title || "Untitled Recipe",
@@ -184,18 +276,23 @@ export default function App() {
     };
   };
 
-  const loadRecipes = async () => {
+  // Pages arrive newest first; pass a cursor to append the next page
+  const loadRecipes = async (cursor?: string) => {
     try {
       setErrorMessage(null);
-      const response = await fetch(`${API_URL}/recipes`);
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+      const response = await fetch(`${API_URL}/recipes/summary${query}`);
       if (!response.ok) {
         throw new Error("Failed to load recipes");
       }
-      const data = (await response.json()) as BackendRecipe[];
-      const mapped = data
-        .map(mapRecipeToVideo)
-        .sort((a, b) => b.processedAt.getTime() - a.processedAt.getTime());
-      setProcessedVideos(mapped);
+      const data = (await response.json()) as RecipeSummaryPage;
+      const mapped = data.items.map(mapSummaryToVideo);
+      setProcessedVideos((prev) => {
+        if (!cursor) return mapped;
+        const known = new Set(prev.map((video) => video.id));
+        return [...prev, ...mapped.filter((video) => !known.has(video.id))];
+      });
+      setNextCursor(data.next_cursor ?? null);
     } catch (error) {
       const message = error instanceof Error ? error.message : "Failed to load recipes";
       setErrorMessage(message);
@@ -218,7 +315,7 @@ export default function App() {
 
     try {
       setErrorMessage(null);
-      const response = await fetch(`${API_URL}/recipes/extract`, {
+      const response = await fetch(`${API_URL}/recipes/extract/stream`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -235,12 +332,28 @@ export default function App() {
         throw new Error(detail);
       }
 
-      const data = (await response.json()) as ExtractResponse;
-      if (!data.success || !data.recipe) {
-        throw new Error(data.message || "Failed to extract recipe");
+      // Progress streams in as NDJSON: stages, then recipe fields as Gemini writes them
+      let recipe: BackendRecipe | null | undefined;
+      let failure: string | null = null;
+      let partial = EMPTY_PARTIAL;
+      for await (const event of readNdjson(response)) {
+        if (event.type === "job" || event.type === "stage") {
+          setProcessingStage(event.stage);
+        } else if (event.type === "partial" || event.type === "partial_reset") {
+          partial = applyPartial(partial, event);
+          setPartialRecipe(partial);
+        } else if (event.type === "completed") {
+          recipe = event.recipe;
+        } else if (event.type === "failed") {
+          failure = event.error;
+        }
+      }
+
+      if (!recipe) {
+        throw new Error(failure || "Failed to extract recipe");
       }
 
-      const newVideo = mapRecipeToVideo(data.recipe);
+      const newVideo = mapRecipeToVideo(recipe);
       setProcessedVideos((prev) => [newVideo, ...prev.filter((video) => video.id !== newVideo.id)]);
       setSelectedVideo(newVideo);
       setIsDialogOpen(true);
@@ -250,12 +363,32 @@ export default function App() {
       setErrorMessage(message);
     } finally {
       setIsProcessing(false);
+      setProcessingStage(null);
+      setPartialRecipe(null);
     }
   };
 
-  const handleVideoClick = (video: ProcessedVideo) => {
-    setSelectedVideo(video);
-    setIsDialogOpen(true);
+  const handleVideoClick = async (video: ProcessedVideo) => {
+    if (video.recipes.length > 0) {
+      setSelectedVideo(video);
+      setIsDialogOpen(true);
+      return;
+    }
+
+    try {
+      setErrorMessage(null);
+      const response = await fetch(`${API_URL}/recipes/${video.id}`);
+      if (!response.ok) {
+        throw new Error("Failed to load recipe");
+      }
+      const detailed = mapRecipeToVideo((await response.json()) as BackendRecipe);
+      setProcessedVideos((prev) => prev.map((item) => (item.id === detailed.id ? detailed : item)));
+      setSelectedVideo(detailed);
+      setIsDialogOpen(true);
+    } catch (error) {
+      const message = error instanceof Error ? error.message : "Failed to load recipe";
+      setErrorMessage(message);
+    }
   };
 
   return (
@@ -371,7 +504,7 @@ export default function App() {
                     {isProcessing ? (
                       <>
                         <Loader2 className="size-4 mr-2 animate-spin" />
-                        Processing
+                        {processingStage ? `${processingStage}…` : "Processing"}
                       </>
                     ) : (
                       <>
@@ -389,12 +522,46 @@ export default function App() {
                 )}
               </div>
             </form>
+
+            {/* Recipe fields as they arrive from the extraction stream */}
+            {isProcessing && partialRecipe && (partialRecipe.title || partialRecipe.ingredients.length > 0) && (
+              <div className="mt-6">
+                <Separator className="mb-4" />
+                <h3 className="text-lg font-semibold">{partialRecipe.title || "Untitled recipe"}</h3>
+                {partialRecipe.description && (
+                  <p className="text-sm text-gray-500 mt-1">{partialRecipe.description}</p>
+                )}
+                {partialRecipe.ingredients.length > 0 && (
+                  <ul className="text-sm text-gray-700 mt-3 list-disc pl-5 space-y-1">
+                    {partialRecipe.ingredients.map((ingredient, index) => (
+                      <li key={index}>
+                        {[ingredient.quantity, ingredient.unit, ingredient.name].filter(Boolean).join(" ")}
+                      </li>
+                    ))}
+                  </ul>
+                )}
+                {partialRecipe.steps.length > 0 && (
+                  <ol className="text-sm text-gray-700 mt-3 list-decimal pl-5 space-y-1">
+                    {partialRecipe.steps.map((step, index) => (
+                      <li key={index}>{step.instruction}</li>
+                    ))}
+                  </ol>
+                )}
+              </div>
+            )}
           </Card>
 
           {/* Results Gallery */}
           <div>
             <h2 className="text-2xl font-semibold mb-6">Processed Videos</h2>
             <RecipeGallery videos={processedVideos} onVideoClick={handleVideoClick} />
+            {nextCursor && (
+              <div className="flex justify-center mt-8">
+                <Button variant="outline" onClick={() => loadRecipes(nextCursor)}>
+                  Load more
+                </Button>
+              </div>
+            )}
           </div>
         </div>
       </main>
@@ -24,7 +24,8 @@ export interface ProcessedVideo {
   url: string;
   thumbnail: string;
   title: string;
-  recipes: Recipe[];
+  platform?: string;
+  recipes: Recipe[]; // empty until the full recipe is loaded
   processedAt: Date;
 }
 
@@ -65,8 +66,8 @@ export function RecipeGallery({ videos, onVideoClick }: RecipeGalleryProps) {
             </div>
             <div className="p-4">
               <h3 className="font-medium text-sm line-clamp-2 mb-2">{video.title}</h3>
-              <p className="text-xs text-gray-500">
-                {video.recipes.length} {video.recipes.length === 1 ? 'recipe' : 'recipes'} found
+              <p className="text-xs text-gray-500 capitalize">
+                {video.platform ?? `${video.recipes.length} ${video.recipes.length === 1 ? 'recipe' : 'recipes'} found`}
               </p>
               <p className="text-xs text-gray-400 mt-1">
                 {video.processedAt.toLocaleDateString()}